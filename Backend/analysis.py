@@ -0,0 +1,204 @@
+import threading
+import weakref
+from concurrent.futures import Executor
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+_local = threading.local()
+# (thread, its buffer dict) for every thread that has scratch buffers, so
+# release_buffers can reach page threads from the thread that ran the job
+_all_buffers = []
+_all_buffers_lock = threading.Lock()
+
+# Tile halos (px) - at least each filter's reach so tile borders leave no seams.
+# Multiples of 16 keep JPEG MCUs aligned with the whole-image encode.
+HALO_DENOISE = 16    # fastNlMeansDenoising: 7px template + 21px search window
+HALO_THRESHOLD = 8   # adaptiveThreshold block size 11
+HALO_EDGES = 8       # Canny 3x3 Sobel; hysteresis is local enough at this reach
+HALO_LAPLACIAN = 2
+HALO_ELA = 16
+
+
+def scratch_buffer(name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+    """Per-thread reusable array; only the latest shape is kept for each name"""
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+        with _all_buffers_lock:
+            _all_buffers.append((weakref.ref(threading.current_thread()), buffers))
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape or buf.dtype != dtype:
+        buf = buffers[name] = np.empty(shape, dtype=dtype)
+    return buf
+
+
+def release_buffers():
+    """Drop every thread's scratch buffers - call between jobs, never while a page is being analyzed"""
+    with _all_buffers_lock:
+        _all_buffers[:] = [(thread, buffers) for thread, buffers in _all_buffers
+                           if thread() is not None and thread().is_alive()]
+        for _, buffers in _all_buffers:
+            buffers.clear()
+
+
+def tile_slices(height: int, width: int, tile: int, halo: int) -> Iterator[tuple]:
+    """((y0, y1, x0, x1) core, (y0, y1, x0, x1) core plus halo) covering the page"""
+    for y in range(0, height, tile):
+        for x in range(0, width, tile):
+            y1, x1 = min(y + tile, height), min(x + tile, width)
+            yield (y, y1, x, x1), (max(0, y - halo), min(height, y1 + halo),
+                                   max(0, x - halo), min(width, x1 + halo))
+
+
+class PageAnalysis:
+    """Lazily computed intermediates for one page, shared by preprocess_image and detect_tampering.
+
+    Scratch results live in per-thread buffers that the next page on the same
+    thread overwrites, so a PageAnalysis must not outlive its page.
+
+    With `tile` set, the expensive filters and the ELA/noise/edge metrics run
+    on overlapping tiles (on `pool` when given) instead of the whole page, so
+    only a few tile-sized temporaries exist at once.
+    """
+
+    def __init__(self, image: np.ndarray, scratch: str = "page", tile: Optional[int] = None,
+                 pool: Optional[Executor] = None):
+        self.image = image
+        self.scratch = scratch
+        self.tile = tile
+        self.pool = pool
+        self._gray = None
+        self._edges = None
+        self._laplacian_var = None
+        self._channel_std = None
+        self._denoised = {}
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            if self.image.ndim == 2:
+                self._gray = self.image
+            else:
+                dst = scratch_buffer(f"{self.scratch}.gray", self.image.shape[:2])
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY, dst=dst)
+        return self._gray
+
+    def _run_tiles(self, fn: Callable, halo: int) -> list:
+        tiles = tile_slices(*self.image.shape[:2], self.tile, halo)
+        return list(self.pool.map(fn, tiles)) if self.pool is not None else [fn(t) for t in tiles]
+
+    def map_tiles(self, fn: Callable, src: np.ndarray, halo: int, dst: np.ndarray = None) -> np.ndarray:
+        """fn(src) computed tile by tile; fn must be a same-size, neighbourhood-local filter"""
+        if not self.tile:
+            return fn(src)
+        dst = np.empty_like(src) if dst is None else dst
+
+        def run(tile):
+            (y0, y1, x0, x1), (py0, py1, px0, px1) = tile
+            out = fn(src[py0:py1, px0:px1])
+            dst[y0:y1, x0:x1] = out[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+        self._run_tiles(run, halo)
+        return dst
+
+    @property
+    def edges(self) -> np.ndarray:
+        if self._edges is None:
+            dst = scratch_buffer(f"{self.scratch}.edges", self.gray.shape)
+            self._edges = self.map_tiles(lambda g: cv2.Canny(g, 50, 150), self.gray, HALO_EDGES, dst) \
+                if self.tile else cv2.Canny(self.gray, 50, 150, edges=dst)
+        return self._edges
+
+    @property
+    def edge_density(self) -> float:
+        if self.tile and self._edges is None:
+            gray = self.gray
+
+            def count(tile):
+                (y0, y1, x0, x1), (py0, py1, px0, px1) = tile
+                edges = cv2.Canny(gray[py0:py1, px0:px1], 50, 150)
+                return cv2.countNonZero(edges[y0 - py0:y1 - py0, x0 - px0:x1 - px0])
+
+            return sum(self._run_tiles(count, HALO_EDGES)) / gray.size
+        return cv2.countNonZero(self.edges) / self.edges.size
+
+    @property
+    def laplacian_var(self) -> float:
+        if self._laplacian_var is None and self.tile:
+            gray = self.gray
+
+            def moments(tile):
+                (y0, y1, x0, x1), (py0, py1, px0, px1) = tile
+                lap = cv2.Laplacian(gray[py0:py1, px0:px1], cv2.CV_16S)
+                mean, std = cv2.meanStdDev(lap[y0 - py0:y1 - py0, x0 - px0:x1 - px0])
+                n = (y1 - y0) * (x1 - x0)
+                return n, mean[0][0] * n, (std[0][0] ** 2 + mean[0][0] ** 2) * n
+
+            parts = self._run_tiles(moments, HALO_LAPLACIAN)
+            n = sum(p[0] for p in parts)
+            mean = sum(p[1] for p in parts) / n
+            self._laplacian_var = float(sum(p[2] for p in parts) / n - mean ** 2)
+        if self._laplacian_var is None:
+            # A 3x3 Laplacian of uint8 stays within +-1020, so int16 holds it
+            # exactly at a quarter of the float64 footprint
+            dst = scratch_buffer(f"{self.scratch}.laplacian", self.gray.shape, np.int16)
+            cv2.Laplacian(self.gray, cv2.CV_16S, dst=dst)
+            # meanStdDev is a single pass; ndarray.var() allocates two more
+            # full-size float64 temporaries
+            _, std = cv2.meanStdDev(dst)
+            self._laplacian_var = float(std[0][0]) ** 2
+        return self._laplacian_var
+
+    @property
+    def channel_std(self) -> Tuple[float, ...]:
+        """Per-channel standard deviation without cv2.split copies"""
+        if self._channel_std is None:
+            _, std = cv2.meanStdDev(self.image)
+            self._channel_std = tuple(float(s) for s in std.ravel())
+        return self._channel_std
+
+    def ela_score(self, quality: int = 90) -> float:
+        """Mean absolute difference against a JPEG re-encode of the page"""
+        channels = 1 if self.image.ndim == 2 else self.image.shape[2]
+        if self.tile:
+            return self._tiled_ela_score(quality, channels)
+        _, jpg = cv2.imencode('.jpg', self.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        flags = cv2.IMREAD_COLOR if self.image.ndim == 3 else cv2.IMREAD_GRAYSCALE
+        recompressed = cv2.imdecode(jpg, flags)
+        del jpg
+        dst = scratch_buffer(f"{self.scratch}.ela", self.image.shape)
+        diff = cv2.absdiff(self.image, recompressed, dst=dst)
+        del recompressed
+        return float(np.mean(cv2.mean(diff)[:channels]))
+
+    def _tiled_ela_score(self, quality: int, channels: int) -> float:
+        image = self.image
+        flags = cv2.IMREAD_COLOR if image.ndim == 3 else cv2.IMREAD_GRAYSCALE
+
+        def diff_sum(tile):
+            (y0, y1, x0, x1), (py0, py1, px0, px1) = tile
+            # Tile origins and halos are multiples of 16, so the 8x8/16x16 JPEG
+            # blocks are the same ones the whole-page encode would produce
+            patch = image[py0:py1, px0:px1]
+            _, jpg = cv2.imencode('.jpg', patch, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            core = np.s_[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+            diff = cv2.absdiff(patch[core], cv2.imdecode(jpg, flags)[core])
+            return sum(cv2.sumElems(diff)[:channels])
+
+        total = sum(self._run_tiles(diff_sum, HALO_ELA))
+        return float(total / (image.shape[0] * image.shape[1] * channels))
+
+    def denoised(self, h: float = 10) -> np.ndarray:
+        if h not in self._denoised:
+            dst = scratch_buffer(f"{self.scratch}.denoised.{h}", self.gray.shape)
+            if self.tile:
+                self.map_tiles(lambda g: cv2.fastNlMeansDenoising(g, h=h), self.gray, HALO_DENOISE, dst)
+                self._denoised[h] = dst
+            else:
+                self._denoised[h] = cv2.fastNlMeansDenoising(self.gray, dst=dst, h=h)
+        return self._denoised[h]
@@ -0,0 +1 @@
+"""Offline benchmarks for the verification pipeline (python -m bench.run from Backend/)"""
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from bench.generate import generate_corpus
+
+
+def copied_ink(ink: np.ndarray, copy_move: Dict, cell: int) -> int:
+    """Area of the inked cells inside the copied source region - what a detector can possibly find"""
+    (x, y), (w, h) = copy_move["source"], copy_move["size"]
+    rows, cols = h // cell, w // cell
+    if rows < 1 or cols < 1:
+        return 0
+    region = ink[y:y + rows * cell, x:x + cols * cell]
+    share = cv2.resize(region, (cols, rows), interpolation=cv2.INTER_AREA).astype(np.int32)
+    return int((share >= 255 * 4 // (cell * cell)).sum()) * cell * cell
+
+
+def check_page(image: np.ndarray, copy_move: Dict = None) -> Dict:
+    """Detector output for one page, plus the ground truth for tampered pages"""
+    import main
+    from copymove import find_copy_move, ink_mask
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    start = time.perf_counter()
+    found = find_copy_move(gray, cell=main.COPY_MOVE_CELL, side=main.COPY_MOVE_SIDE,
+                           min_shift=main.COPY_MOVE_MIN_SHIFT, candidates=main.COPY_MOVE_CANDIDATES)
+    report = {"shift": found["shift"], "matched_area": found["matched_area"], "text_area": found["text_area"],
+              "text_height": found["text_height"], "flagged": found["text_area"] > main.COPY_MOVE_MIN_TEXT_AREA,
+              "ms": round((time.perf_counter() - start) * 1000, 1)}
+    if copy_move:
+        truth = [copy_move["target"][1] - copy_move["source"][1], copy_move["target"][0] - copy_move["source"][0]]
+        report["true_shift"] = truth
+        # In the same text-height units as the detector's threshold
+        ink = copied_ink(ink_mask(gray), copy_move, main.COPY_MOVE_CELL)
+        report["copied_text_area"] = round(ink / max(found["text_height"], 1) ** 2, 2)
+        # A page can also repeat a printed word, so look for the copy among all
+        # verified candidates rather than only the largest one
+        at_truth = [c["text_area"] for c in found["candidates"] if c["shift"] == truth]
+        report["shift_found"] = bool(at_truth)
+        report["copy_flagged"] = max(at_truth, default=0) > main.COPY_MOVE_MIN_TEXT_AREA
+    return report
+
+
+def run_checks(data_dir: str, manifest: List[Dict], min_recall: float, max_false_flags: float) -> Dict:
+    import main
+
+    pages = {}
+    for entry in manifest:
+        if entry["kind"] != "image":
+            continue
+        image = main.load_image(os.path.join(data_dir, entry["file"]))
+        pages[entry["file"]] = {"variant": entry["variant"], **check_page(image, entry.get("copy_move"))}
+
+    # Copies that carry less ink than the flagging threshold (a blank strip,
+    # a few glyph fragments) cannot be told apart from repeated words, so
+    # recall is measured on the copies that could be flagged at all
+    tampered = [p for p in pages.values() if p["variant"] == "tampered"]
+    detectable = [p for p in tampered if p["copied_text_area"] > main.COPY_MOVE_MIN_TEXT_AREA]
+    caught = [p for p in detectable if p["copy_flagged"]]
+    summary = {
+        "min_text_area": main.COPY_MOVE_MIN_TEXT_AREA,
+        "tampered": len(tampered),
+        "detectable": len(detectable),
+        "caught": len(caught),
+        "recall": round(len(caught) / len(detectable), 3) if detectable else None,
+        "shift_found": sum(p["shift_found"] for p in tampered),
+        "false_flags": {},
+        "max_ms": max((p["ms"] for p in pages.values()), default=0)
+    }
+    failures = []
+    if detectable and summary["recall"] < min_recall:
+        failures.append(f"caught {len(caught)} of {len(detectable)} detectable copies (min recall {min_recall:.0%})")
+    # Untampered pages - noise-free renders repeat printed labels pixel for
+    # pixel, scan-like ones add noise, skew and JPEG - are all held to the limit
+    for variant in ("clean", "degraded"):
+        untouched = [p for p in pages.values() if p["variant"] == variant]
+        flagged = sum(p["flagged"] for p in untouched)
+        summary["false_flags"][variant] = flagged
+        if untouched and flagged / len(untouched) > max_false_flags:
+            failures.append(f"flagged {flagged} of {len(untouched)} {variant} pages")
+    return {"summary": summary, "pages": pages, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run copy-move detection on the generator's tampered corpus")
+    parser.add_argument("--data", help="existing corpus from bench.generate (default: generate a fresh one)")
+    parser.add_argument("--seeds", default="0,1,2", help="corpora to generate; recall is pooled across them")
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--min-recall", type=float, default=0.7,
+                        help="min share of detectable copies found and flagged at their true shift")
+    parser.add_argument("--max-false-flags", type=float, default=0.0,
+                        help="max share of clean or degraded (untampered) pages flagged")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="bench-")
+    try:
+        if args.data:
+            with open(os.path.join(data_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        else:
+            manifest = []
+            for seed in args.seeds.split(","):
+                entries = generate_corpus(os.path.join(data_dir, f"seed{seed}"), int(seed),
+                                          args.sizes.split(","), pdf_pages=())
+                manifest += [{**entry, "file": f"seed{seed}/{entry['file']}"} for entry in entries]
+        report = run_checks(data_dir, manifest, args.min_recall, args.max_false_flags)
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in report["failures"]:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
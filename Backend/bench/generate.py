@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from doc_rules import verhoeff_valid
+
+# Render DPI per size preset; certificates and marksheets are A4, ID cards are
+# drawn at twice a real card (3.37 x 2.13 in) so their text stays legible
+SIZES = {"small": 100, "medium": 200, "large": 300}
+CARD_INCHES = (6.74, 4.26)
+A4_INCHES = (8.27, 11.69)
+
+DOC_TYPES = ["aadhaar", "pan", "marksheet", "income", "caste"]
+
+FIRST_NAMES = ["Ravi", "Priya", "Amit", "Sneha", "Arjun", "Kavita", "Rahul", "Anjali"]
+LAST_NAMES = ["Kumar", "Sharma", "Patel", "Singh", "Verma", "Gupta", "Reddy", "Nair"]
+
+
+def aadhaar_number(rng: np.random.Generator) -> str:
+    body = str(rng.integers(2, 10)) + "".join(str(d) for d in rng.integers(0, 10, 10))
+    check = next(str(d) for d in range(10) if verhoeff_valid(body + str(d)))
+    number = body + check
+    return f"{number[:4]} {number[4:8]} {number[8:]}"
+
+
+def pan_number(rng: np.random.Generator) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    pick = lambda n: "".join(letters[i] for i in rng.integers(0, 26, n))
+    return f"{pick(3)}P{pick(1)}{rng.integers(1000, 10000)}{pick(1)}"
+
+
+def document_lines(doc_type: str, rng: np.random.Generator) -> List[str]:
+    """Text lines carrying the keywords, numbers and fields DOC_PATTERNS looks for"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    father = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    dob = f"{rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}/{rng.integers(1995, 2008)}"
+    certificate = f"CERT{rng.integers(10 ** 7, 10 ** 8)}"
+
+    if doc_type == "aadhaar":
+        return ["GOVERNMENT OF INDIA", "Unique Identification Authority of India (UIDAI)",
+                name, f"DOB: {dob}", "Gender: Male", aadhaar_number(rng), "Aadhaar - Aam Aadmi ka Adhikar"]
+    if doc_type == "pan":
+        return ["INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "Permanent Account Number Card",
+                pan_number(rng), f"Name: {name}", f"Father's Name: {father}", f"Date of Birth: {dob}"]
+    if doc_type == "marksheet":
+        roll = rng.integers(10 ** 7, 10 ** 9)
+        subjects = ["Mathematics", "Physics", "Chemistry", "English", "Computer Science"]
+        marks = rng.integers(55, 100, len(subjects))
+        return (["STATE UNIVERSITY OF TECHNOLOGY", "Statement of Marks - Semester Examination Result",
+                 f"Name: {name}", f"Roll No: {roll}", "Institution: City College of Engineering"]
+                + [f"{subject:<20} {mark:>3} / 100" for subject, mark in zip(subjects, marks)]
+                + [f"Total Marks: {marks.sum()} / {100 * len(subjects)}", "Grade: A", "Board of Examinations"])
+    if doc_type == "income":
+        return ["GOVERNMENT OF MAHARASHTRA", "Revenue Department", "INCOME CERTIFICATE",
+                f"Certificate No: {certificate}", f"Name: {name}", f"Father's Name: {father}",
+                f"Annual Income: Rs. {rng.integers(50, 800) * 1000}", "Valid for one year from issue",
+                f"Date of Issue: {dob[:6]}2024", "Tehsildar"]
+    if doc_type == "caste":
+        return ["GOVERNMENT OF MAHARASHTRA", "CASTE CERTIFICATE", f"Certificate No: {certificate}",
+                f"Name: {name}", f"Father's Name: {father}",
+                f"belongs to the {rng.choice(['Scheduled Caste', 'Scheduled Tribe', 'OBC'])} category",
+                f"Date of Issue: {dob[:6]}2023", "Sub Divisional Officer"]
+    raise ValueError(f"Unknown document type: {doc_type}")
+
+
+def render_page(lines: List[str], width: int, height: int) -> np.ndarray:
+    page = np.full((height, width, 3), 255, np.uint8)
+    scale = width / 1400
+    thickness = max(1, round(2 * scale))
+    step = max(int(60 * scale * 1.4), int(height / (len(lines) + 2)))
+    step = min(step, int(90 * scale * 1.4))
+    cv2.rectangle(page, (int(20 * scale), int(20 * scale)),
+                  (width - int(20 * scale), height - int(20 * scale)), (60, 60, 60), thickness)
+    for i, line in enumerate(lines):
+        y = int(80 * scale) + i * step
+        if y > height - int(40 * scale):
+            break
+        cv2.putText(page, line, (int(60 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.1 * scale, (20, 20, 20), thickness, cv2.LINE_AA)
+    return page
+
+
+def add_noise(image: np.ndarray, sigma: float, rng: np.random.Generator) -> np.ndarray:
+    noise = rng.normal(0, sigma, image.shape)
+    return np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+def add_skew(image: np.ndarray, degrees: float) -> np.ndarray:
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), borderValue=(255, 255, 255))
+
+
+def jpeg_roundtrip(image: np.ndarray, quality: int) -> np.ndarray:
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def copy_move(image: np.ndarray, rng: np.random.Generator) -> Dict:
+    """Paste a text region elsewhere on the page (in place); returns the ground truth"""
+    height, width = image.shape[:2]
+    block_h, block_w = height // 8, width // 3
+    src_y = int(rng.integers(height // 10, height // 2 - block_h))
+    src_x = int(rng.integers(width // 20, width // 3))
+    dst_y = min(height - block_h - 1, src_y + height // 3)
+    dst_x = min(width - block_w - 1, src_x + width // 3)
+    image[dst_y:dst_y + block_h, dst_x:dst_x + block_w] = image[src_y:src_y + block_h, src_x:src_x + block_w]
+    return {"source": [src_x, src_y], "target": [dst_x, dst_y], "size": [block_w, block_h]}
+
+
+def generate_document(doc_type: str, size: str = "medium", rng: Optional[np.random.Generator] = None,
+                      noise: float = 0.0, skew: float = 0.0, jpeg_quality: Optional[int] = None,
+                      tamper: bool = False) -> tuple:
+    """(BGR page, metadata) for one synthetic document"""
+    rng = rng or np.random.default_rng(0)
+    dpi = SIZES[size]
+    inches = CARD_INCHES if doc_type in ("aadhaar", "pan") else A4_INCHES
+    width, height = int(inches[0] * dpi), int(inches[1] * dpi)
+
+    lines = document_lines(doc_type, rng)
+    page = render_page(lines, width, height)
+    meta = {"doc_type": doc_type, "size": size, "width": width, "height": height, "lines": lines,
+            "noise": noise, "skew": skew, "jpeg_quality": jpeg_quality, "copy_move": None}
+    if tamper:
+        meta["copy_move"] = copy_move(page, rng)
+    if skew:
+        page = add_skew(page, skew)
+    if noise:
+        page = add_noise(page, noise, rng)
+    if jpeg_quality:
+        page = jpeg_roundtrip(page, jpeg_quality)
+    return page, meta
+
+
+def write_pdf(pages: List[np.ndarray], path: str, dpi: int):
+    images = [Image.fromarray(cv2.cvtColor(page, cv2.COLOR_BGR2RGB)) for page in pages]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+
+
+def generate_corpus(out_dir: str, seed: int = 0, sizes: List[str] = ("small", "medium"),
+                    doc_types: List[str] = DOC_TYPES, pdf_pages: List[int] = (1, 3)) -> List[Dict]:
+    """Write one clean, one degraded and one tampered image per type and size, plus
+    multi-page PDFs; returns the manifest (also saved as manifest.json)"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    variants = {
+        "clean": {},
+        "degraded": {"noise": 12.0, "skew": 1.5, "jpeg_quality": 60},
+        "tampered": {"tamper": True, "jpeg_quality": 90}
+    }
+    manifest = []
+    for size in sizes:
+        for doc_type in doc_types:
+            for variant, options in variants.items():
+                page, meta = generate_document(doc_type, size, rng, **options)
+                ext = ".jpg" if options.get("jpeg_quality") else ".png"
+                name = f"{doc_type}-{size}-{variant}{ext}"
+                cv2.imwrite(os.path.join(out_dir, name), page)
+                manifest.append({"file": name, "kind": "image", "variant": variant, "pages": 1, **meta})
+
+        for count in pdf_pages:
+            pages = [generate_document(DOC_TYPES[i % len(DOC_TYPES)], size, rng, noise=6.0)[0]
+                     for i in range(count)]
+            # PDF pages share one page size, so cards are padded onto A4
+            a4 = (int(A4_INCHES[1] * SIZES[size]), int(A4_INCHES[0] * SIZES[size]))
+            pages = [cv2.copyMakeBorder(p, 0, max(0, a4[0] - p.shape[0]), 0, max(0, a4[1] - p.shape[1]),
+                                        cv2.BORDER_CONSTANT, value=(255, 255, 255))[:a4[0], :a4[1]]
+                     for p in pages]
+            name = f"bundle-{size}-{count}p.pdf"
+            write_pdf(pages, os.path.join(out_dir, name), SIZES[size])
+            manifest.append({"file": name, "kind": "pdf", "variant": "clean", "pages": count,
+                             "size": size, "doc_type": "bundle", "width": a4[1], "height": a4[0]})
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic scholarship documents")
+    parser.add_argument("--out", default="bench_data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="small,medium", help=f"comma list of {','.join(SIZES)}")
+    parser.add_argument("--types", default=",".join(DOC_TYPES))
+    parser.add_argument("--pdf-pages", default="1,3", help="page counts of the PDF bundles")
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.out, args.seed, args.sizes.split(","), args.types.split(","),
+                               [int(n) for n in args.pdf_pages.split(",") if n])
+    print(f"Wrote {len(manifest)} documents to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Must not be imported while the service modules load with LAZY_IMPORTS on
+DEFERRED = {
+    "main": ["cv2", "PIL.Image", "pdf2image", "pytesseract", "tesserocr"],
+    "chat": ["speech_recognition", "gtts"]
+}
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_import(module: str, env: Dict) -> Dict:
+    """One cold `import module` in a fresh interpreter: total time, slowest imports, heavy modules loaded"""
+    probe = (f"import json, sys; import {module}; "
+             f"print(json.dumps(sorted(m for m in {DEFERRED[module]!r} if m in sys.modules)))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.dirname(
+                              os.path.abspath(__file__))))
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = None
+    top = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = match.groups()
+        if name == module and len(indent) == 1:
+            total_us = int(cumulative)
+        elif len(indent) == 3:
+            top.append((int(cumulative), name))
+    top.sort(reverse=True)
+    return {"total_ms": total_us / 1000, "loaded_heavy": json.loads(proc.stdout.strip().splitlines()[-1]),
+            "slowest": {name: round(us / 1000, 1) for us, name in top[:5]}}
+
+
+def check(modules: List[str], budget_ms: float, runs: int, lazy: bool) -> Dict:
+    env = {**os.environ, "LAZY_IMPORTS": "true" if lazy else "false",
+           "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "import-budget-check")}
+    report = {"budget_ms": budget_ms, "lazy_imports": lazy, "modules": {}, "failures": []}
+    for module in modules:
+        samples = [measure_import(module, env) for _ in range(runs)]
+        median = statistics.median(sample["total_ms"] for sample in samples)
+        loaded = samples[-1]["loaded_heavy"]
+        report["modules"][module] = {"median_ms": round(median, 1), "runs": runs,
+                                     "loaded_heavy": loaded, "slowest": samples[-1]["slowest"]}
+        if median > budget_ms:
+            report["failures"].append(f"import {module} took {median:.0f} ms (budget {budget_ms:.0f} ms)")
+        if lazy and loaded:
+            report["failures"].append(f"import {module} loaded deferred modules: {', '.join(loaded)}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check service import time against a budget")
+    parser.add_argument("--modules", default="main,chat")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=3, help="cold imports per module (the median is checked)")
+    parser.add_argument("--eager", action="store_true", help="measure with LAZY_IMPORTS=false for comparison")
+    args = parser.parse_args()
+
+    report = check(args.modules.split(","), args.budget_ms, args.runs, lazy=not args.eager)
+    print(json.dumps(report, indent=2))
+    for failure in report["failures"]:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Prompt cues -> canned document type, checked in order
+DOC_TYPE_CUES = [
+    (name, re.compile(r"\b(" + "|".join(cues) + r")\b"))
+    for name, cues in [
+        ("Aadhaar Card", ["aadhaar", "aadhar", "unique identification"]),
+        ("PAN Card", ["permanent account number", "income tax department", "pan"]),
+        ("Marksheet", ["marksheet", "mark sheet", "marks obtained", "statement of marks"]),
+        ("Income Certificate", ["income certificate", "annual income"]),
+        ("Caste Certificate", ["caste certificate", "scheduled caste", "scheduled tribe", "obc"])
+    ]
+]
+AADHAAR_RE = re.compile(r"\b\d{4}\s?\d{4}\s?\d{4}\b")
+PAN_RE = re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b")
+NAME_RE = re.compile(r"name\s*[:\-]\s*([A-Za-z]+(?: [A-Za-z]+){0,2})", re.IGNORECASE)
+PACKED_RE = re.compile(r"=== Document (\d+) ===\n(.*?)(?=\n\n=== Document \d+ ===|\Z)", re.DOTALL)
+
+CHAT_SENTENCES = [
+    "Log in to your dashboard and open the Documents tab.",
+    "Upload a clear scan of each required document in PDF, JPG or PNG format.",
+    "AI verification usually finishes within a minute of the upload.",
+    "SAG Bureau review takes two to three business days.",
+    "You can track every stage, with its blockchain transaction hash, on the timeline view.",
+    "If a document is rejected, the remarks explain what to fix before you re-upload it.",
+    "Finance Bureau approval follows automatically once the SAG officer verifies your documents.",
+    "Contact support@scholarshipplatform.com if the problem persists."
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from 'fixed:S', 'uniform:LO,HI', 'exponential:MEAN' or 'lognormal:MEDIAN,SIGMA' (seconds)"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_rates(spec: str) -> Dict[int, float]:
+    """'429=0.05,500=0.01' -> {429: 0.05, 500: 0.01}"""
+    rates = {}
+    for item in filter(None, spec.split(",")):
+        status, _, rate = item.partition("=")
+        rates[int(status)] = float(rate)
+    return rates
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def canned_validation(text: str, rng: random.Random) -> Dict:
+    """A plausible answer in the ai_validate_document schema for one document's OCR text"""
+    lowered = text.lower()
+    doc_type = next((name for name, cues in DOC_TYPE_CUES if cues.search(lowered)), "Unknown")
+    number = AADHAAR_RE.search(text) if doc_type == "Aadhaar Card" else PAN_RE.search(text)
+    name = NAME_RE.search(text)
+    confidence = rng.randint(70, 90) if doc_type != "Unknown" else rng.randint(20, 45)
+    return {
+        "document_type": doc_type,
+        "extracted_data": {
+            "name": name.group(1).strip() if name else None,
+            "document_number": number.group(0) if number else None,
+            "dob": None, "father_name": None, "address": None,
+            "marks": "412/500" if doc_type == "Marksheet" else None,
+            "roll_number": None, "institution": None,
+            "income_amount": "Rs. 1,80,000" if doc_type == "Income Certificate" else None,
+            "caste_category": "OBC" if doc_type == "Caste Certificate" else None,
+            "issue_date": None, "validity": None
+        },
+        "confidence": confidence,
+        "is_valid_format": doc_type != "Unknown",
+        "quality_issues": [] if confidence >= 70 else ["Document type could not be determined"],
+        "text_clarity": "good" if confidence >= 70 else "poor",
+        "completeness": confidence
+    }
+
+
+class StubLLM:
+    """Canned OpenAI-style chat completions with injected latency and errors"""
+
+    def __init__(self, latency: str = "lognormal:0.6,0.5", token_latency: float = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None, rpm: int = 0, retry_after: float = 2.0,
+                 malformed_rate: float = 0.0, chat_sentences: int = 4, seed: Optional[int] = None):
+        self.sample_latency = parse_latency(latency)
+        self.token_latency = token_latency
+        self.error_rates = error_rates or {}
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.chat_sentences = chat_sentences
+        self.rng = random.Random(seed)
+        self._window = deque()  # accepted request times within the last minute
+        self.stats = {"requests": 0, "completions": 0, "malformed": 0, "by_kind": {}, "errors": {}}
+
+    def _rate_limited(self) -> Optional[float]:
+        """Seconds until a slot frees up when the RPM quota is used up, else None"""
+        if not self.rpm:
+            return None
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - 60:
+            self._window.popleft()
+        if len(self._window) >= self.rpm:
+            return self._window[0] + 60 - now
+        self._window.append(now)
+        return None
+
+    def _error(self, status: int, message: str, retry_after: Optional[float] = None) -> JSONResponse:
+        self.stats["errors"][status] = self.stats["errors"].get(status, 0) + 1
+        headers = {"Retry-After": str(math.ceil(retry_after))} if retry_after is not None else None
+        return JSONResponse({"error": {"message": message, "type": "stub_error", "code": status}},
+                            status_code=status, headers=headers)
+
+    def answer(self, messages: List[Dict]) -> tuple:
+        """(kind, assistant content) for a chat request"""
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        prompt = messages[-1]["content"] if messages else ""
+        if "document validator" not in system:
+            count = self.rng.randint(max(1, self.chat_sentences - 1), self.chat_sentences + 1)
+            return "chat", " ".join(self.rng.choice(CHAT_SENTENCES) for _ in range(count))
+
+        if self.rng.random() < self.malformed_rate:
+            self.stats["malformed"] += 1
+            return "malformed", "Sorry, I could not produce JSON for this document."
+        documents = PACKED_RE.findall(prompt)
+        if documents:
+            entries = [{"index": int(index), **canned_validation(text, self.rng)} for index, text in documents]
+            return "validation_packed", json.dumps(entries)
+        text = prompt.split("Document Text:", 1)[-1].split("Return JSON with this exact structure:", 1)[0]
+        return "validation", json.dumps(canned_validation(text, self.rng))
+
+    async def complete(self, body: Dict):
+        self.stats["requests"] += 1
+        wait = self._rate_limited()
+        if wait is not None:
+            return self._error(429, "Rate limit reached for requests per minute", max(1.0, wait))
+        roll = self.rng.random()
+        for status, rate in self.error_rates.items():
+            if roll < rate:
+                retry_after = self.retry_after if status == 429 else None
+                return self._error(status, f"Injected {status}", retry_after)
+            roll -= rate
+
+        messages = body.get("messages") or []
+        kind, content = self.answer(messages)
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        self.stats["completions"] += 1
+        self.stats["by_kind"][kind] = self.stats["by_kind"].get(kind, 0) + 1
+        header = {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "created": int(time.time()),
+                  "model": body.get("model", "stub")}
+        if body.get("stream"):
+            return StreamingResponse(self.stream_chunks(header, content, usage), media_type="text/event-stream")
+
+        await asyncio.sleep(self.sample_latency(self.rng) + self.token_latency * completion_tokens)
+        return {**header, "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage}
+
+    async def stream_chunks(self, header: Dict, content: str, usage: Dict):
+        """Groq-style SSE chunks: the sampled latency before the first word, token_latency per token after"""
+        def chunk(delta: Dict, finish_reason: Optional[str] = None, **extra) -> str:
+            body = {**header, "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            return f"data: {json.dumps(body)}\n\n"
+
+        await asyncio.sleep(self.sample_latency(self.rng))
+        yield chunk({"role": "assistant", "content": ""})
+        for word in re.findall(r"\S+\s*", content):
+            yield chunk({"content": word})
+            await asyncio.sleep(self.token_latency * estimate_tokens(word))
+        yield chunk({}, "stop", x_groq={"usage": usage})
+        yield "data: [DONE]\n\n"
+
+
+def create_app(stub: StubLLM) -> FastAPI:
+    app = FastAPI(title="Stub LLM server")
+
+    # Served under both Groq's and OpenAI's path layouts
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await stub.complete(await request.json())
+
+    @app.get("/stats")
+    def stats():
+        return stub.stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline OpenAI-compatible LLM stub for load tests",
+        epilog="Point both services at it with GROQ_BASE_URL=http://HOST:PORT/openai/v1 (any GROQ_API_KEY "
+               "works), and raise LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE so the client-side "
+               "limiter is not the bottleneck."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", default="lognormal:0.6,0.5",
+                        help="fixed:S | uniform:LO,HI | exponential:MEAN | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--errors", default="", help="injected error rates, e.g. 429=0.05,500=0.01")
+    parser.add_argument("--rpm", type=int, default=0, help="answer 429 beyond this many requests a minute")
+    parser.add_argument("--retry-after", type=float, default=2.0, help="Retry-After on injected 429s")
+    parser.add_argument("--malformed", type=float, default=0.0, help="share of validations answered with non-JSON")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = StubLLM(args.latency, args.token_latency, parse_rates(args.errors), args.rpm, args.retry_after,
+                   args.malformed, seed=args.seed)
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from bench.generate import generate_corpus
+
+OPERATIONS = ["verify", "verify-batch", "chat", "scholarship-query"]
+QUERY_TYPES = ["registration", "document_upload", "verification", "disbursement", "technical"]
+QUESTIONS = [
+    "How do I upload my income certificate?",
+    "My Aadhaar upload was rejected, what should I do?",
+    "How long does SAG verification take?",
+    "Where can I see the blockchain transaction hash for my disbursement?",
+    "Which documents are required for the OBC scholarship?",
+    "The upload page keeps failing for my PDF marksheet."
+]
+# Shed load, not failures - the services answer these when they are saturated
+SHED_STATUSES = {429, 503}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'verify=4,chat=3' -> operation weights"""
+    mix = {}
+    for item in filter(None, spec.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r} (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Builds requests for each operation from a synthetic corpus"""
+
+    def __init__(self, data_dir: str, manifest: List[Dict], verify_url: str, chat_url: str,
+                 batch_size: int, unique_uploads: bool, rng: random.Random):
+        self.verify_url = verify_url.rstrip("/")
+        self.chat_url = chat_url.rstrip("/")
+        self.batch_size = batch_size
+        self.unique_uploads = unique_uploads
+        self.rng = rng
+        self.documents = []
+        for entry in manifest:
+            with open(os.path.join(data_dir, entry["file"]), "rb") as f:
+                self.documents.append((entry["file"], f.read()))
+
+    def _document(self) -> tuple:
+        name, data = self.rng.choice(self.documents)
+        if self.unique_uploads:
+            # Decoders ignore bytes after the end marker, so the page is unchanged
+            # but the hash differs and the verdict cache never answers
+            data += os.urandom(16)
+        return name, data, mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    def request(self, operation: str) -> tuple:
+        """(method, url, httpx request kwargs)"""
+        if operation == "verify":
+            return "POST", f"{self.verify_url}/verify", {"files": {"file": self._document()},
+                                                          "data": {"applicant_id": f"load-{self.rng.randrange(10**6)}"}}
+        if operation == "verify-batch":
+            files = [("files", self._document()) for _ in range(self.batch_size)]
+            return "POST", f"{self.verify_url}/verify-batch", {"files": files}
+        if operation == "chat":
+            return "POST", f"{self.chat_url}/chat", {"json": {"message": self.rng.choice(QUESTIONS),
+                                                             "user_role": "student"}}
+        return "POST", f"{self.chat_url}/scholarship-query", {"json": {
+            "query_type": self.rng.choice(QUERY_TYPES), "question": self.rng.choice(QUESTIONS)}}
+
+
+def outcome(response: httpx.Response) -> str:
+    if response.status_code in SHED_STATUSES:
+        return "shed"
+    if response.status_code >= 400:
+        return "error"
+    # The chatbot reports its own failures in a 200 body
+    try:
+        body = response.json()
+    except ValueError:
+        return "error"
+    return "error" if isinstance(body, dict) and body.get("error") else "ok"
+
+
+async def run_step(client: httpx.AsyncClient, workload: Workload, mix: Dict[str, float],
+                   concurrency: int, duration: float, rng: random.Random) -> List[tuple]:
+    """Closed loop: `concurrency` workers issue back-to-back requests for `duration` seconds"""
+    operations, weights = list(mix), list(mix.values())
+    samples = []  # (operation, seconds, outcome, status)
+    stop_at = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < stop_at:
+            operation = rng.choices(operations, weights)[0]
+            method, url, kwargs = workload.request(operation)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                result, status = outcome(response), response.status_code
+            except httpx.HTTPError as e:
+                result, status = "error", type(e).__name__
+            samples.append((operation, time.perf_counter() - start, result, status))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def summarize(samples: List[tuple], elapsed: float) -> Dict:
+    def stats(rows):
+        latencies = np.array([row[1] for row in rows]) * 1000
+        outcomes = [row[2] for row in rows]
+        statuses = {}
+        for row in rows:
+            statuses[str(row[3])] = statuses.get(str(row[3]), 0) + 1
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(outcomes.count("ok") / elapsed, 2),
+            "error_rate": round(outcomes.count("error") / len(rows), 4),
+            "shed_rate": round(outcomes.count("shed") / len(rows), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+            "max_ms": round(float(latencies.max()), 1),
+            "statuses": statuses
+        }
+
+    if not samples:
+        return {"requests": 0}
+    by_operation = {}
+    for row in samples:
+        by_operation.setdefault(row[0], []).append(row)
+    return {**stats(samples), "operations": {name: stats(rows) for name, rows in sorted(by_operation.items())}}
+
+
+async def wait_ready(client: httpx.AsyncClient, urls: List[str], timeout: float):
+    """Block until every service answers /health/ready with 200"""
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if (await client.get(f"{url}/health/ready")).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+            await asyncio.sleep(1)
+
+
+async def run_load(workload: Workload, mix: Dict[str, float], steps: List[int], duration: float,
+                   timeout: float, max_error_rate: float, seed: int, ready_timeout: Optional[float]) -> List[Dict]:
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=max(steps), max_keepalive_connections=max(steps))
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        if ready_timeout:
+            services = [workload.verify_url] if any(op.startswith("verify") for op in mix) else []
+            services += [workload.chat_url] if any(not op.startswith("verify") for op in mix) else []
+            await wait_ready(client, services, ready_timeout)
+        report = []
+        for concurrency in steps:
+            start = time.monotonic()
+            samples = await run_step(client, workload, mix, concurrency, duration, rng)
+            step = {"concurrency": concurrency, **summarize(samples, time.monotonic() - start)}
+            report.append(step)
+            if step["requests"]:
+                print(f"c={concurrency:<4} {step['requests']:>6} req  {step['throughput_rps']:>8.2f} ok/s   "
+                      f"p50 {step['p50_ms']:>8.1f} ms   p95 {step['p95_ms']:>8.1f} ms   p99 {step['p99_ms']:>8.1f} ms   "
+                      f"err {step['error_rate']:.1%}   shed {step['shed_rate']:.1%}", file=sys.stderr)
+            if step.get("error_rate", 0) > max_error_rate:
+                print(f"Stopping: error rate above {max_error_rate:.0%}", file=sys.stderr)
+                break
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive mixed traffic at the verification and chatbot services with rising concurrency",
+        epilog="Run the services against the offline LLM stub (bench.llm_stub) with GROQ_BASE_URL set, "
+               "and TTS_ENABLED=false for the chatbot, to keep load tests off the real Groq and gTTS services."
+    )
+    parser.add_argument("--verify-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--chat-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default="verify=4,verify-batch=1,chat=3,scholarship-query=2",
+                        help="operation weights")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="concurrency steps")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout")
+    parser.add_argument("--batch-size", type=int, default=3, help="files per /verify-batch request")
+    parser.add_argument("--max-error-rate", type=float, default=0.5, help="stop escalating above this")
+    parser.add_argument("--data", help="existing corpus from bench.generate (default: generate a fresh one)")
+    parser.add_argument("--sizes", default="small")
+    parser.add_argument("--allow-cache-hits", action="store_true",
+                        help="upload identical bytes so repeat documents hit the verdict cache")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="wait for /health/ready (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    data_dir = args.data or tempfile.mkdtemp(prefix="load-")
+    try:
+        if args.data:
+            with open(os.path.join(data_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        else:
+            manifest = generate_corpus(data_dir, args.seed, args.sizes.split(","))
+        workload = Workload(data_dir, manifest, args.verify_url, args.chat_url, args.batch_size,
+                            not args.allow_cache_hits, random.Random(args.seed))
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    steps = [int(c) for c in args.concurrency.split(",")]
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "mix": mix, "duration_s": args.duration,
+                 "verify_url": args.verify_url, "chat_url": args.chat_url, "documents": len(manifest),
+                 "unique_uploads": not args.allow_cache_hits},
+        "steps": asyncio.run(run_load(workload, mix, steps, args.duration, args.timeout,
+                                      args.max_error_rate, args.seed, args.ready_timeout))
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from bench.generate import generate_corpus
+
+STAGES = ["decode", "pdf_render", "preprocess", "tampering", "ocr", "extract"]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples: List[float], pixels: List[int]) -> Dict:
+    values = np.array(samples)
+    total = float(values.sum())
+    return {
+        "runs": len(samples),
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 2),
+        "mean_ms": round(float(values.mean()) * 1000, 2),
+        "docs_per_s": round(len(samples) / total, 2) if total else None,
+        "megapixels_per_s": round(sum(pixels) / 1e6 / total, 2) if total else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def measure(fn: Callable, items: List, repeat: int) -> List[float]:
+    """Time fn(item) for every item, repeat times after one untimed warm-up pass"""
+    for item in items[:1]:
+        fn(item)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmarks(data_dir: str, manifest: List[Dict], stages: List[str], repeat: int) -> Dict:
+    import main
+
+    available = {"tesseract": bool(shutil.which("tesseract") or os.getenv("TESSERACT_CMD")),
+                 "poppler": bool(shutil.which("pdftoppm"))}
+    images = [entry for entry in manifest if entry["kind"] == "image"]
+    pdfs = [entry for entry in manifest if entry["kind"] == "pdf"]
+    paths = {entry["file"]: os.path.join(data_dir, entry["file"]) for entry in manifest}
+    decoded = {entry["file"]: main.load_image(paths[entry["file"]]) for entry in images}
+
+    def pdf_pages(entry):
+        return list(main.iter_pdf_pages(paths[entry["file"]]))
+
+    def ocr(entry):
+        image = decoded[entry["file"]]
+        return main.ocr_page(image, main.page_analysis(image))
+
+    def extract(entry):
+        return main.extract_text_from_file(paths[entry["file"]], entry["file"])
+
+    plans = {
+        "decode": (lambda entry: main.load_image(paths[entry["file"]]), images, None),
+        "pdf_render": (pdf_pages, pdfs, "poppler"),
+        "preprocess": (lambda entry: main.preprocess_image(decoded[entry["file"]]), images, None),
+        "tampering": (lambda entry: main.detect_tampering(decoded[entry["file"]]), images, None),
+        "ocr": (ocr, images, "tesseract"),
+        "extract": (extract, images + pdfs, "tesseract")
+    }
+
+    results = {}
+    for stage in stages:
+        fn, items, needs = plans[stage]
+        if needs and not available[needs]:
+            results[stage] = {"skipped": f"{needs} not installed"}
+            continue
+        if stage == "extract" and not available["poppler"]:
+            items = images
+        if not items:
+            results[stage] = {"skipped": "no documents"}
+            continue
+        pixels = [entry["width"] * entry["height"] * entry["pages"] for entry in items]
+        samples = measure(fn, items, repeat)
+        results[stage] = summarize(samples, pixels * repeat)
+        print(f"{stage:<12} p50 {results[stage]['p50_ms']:>9.2f} ms   p95 {results[stage]['p95_ms']:>9.2f} ms   "
+              f"{results[stage]['docs_per_s']:>8.2f} docs/s", file=sys.stderr)
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> Dict:
+    """Per-stage p50/p95 ratios against a baseline run; ratio > 1 + threshold is a regression"""
+    report = {}
+    for stage, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or "p50_ms" not in base or "p50_ms" not in stats:
+            continue
+        ratios = {key: round(stats[key] / base[key], 3) for key in ("p50_ms", "p95_ms") if base[key]}
+        report[stage] = {**ratios, "regression": any(r > 1 + threshold for r in ratios.values())}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the verification pipeline on synthetic documents")
+    parser.add_argument("--data", help="existing corpus from bench.generate (default: generate a fresh one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="small,medium")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against a previous report")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="bench-")
+    try:
+        if args.data:
+            with open(os.path.join(data_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        else:
+            manifest = generate_corpus(data_dir, args.seed, args.sizes.split(","))
+
+        import main as service
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "pipeline_version": service.PIPELINE_VERSION,
+                "tampering_mode": service.TAMPERING_MODE,
+                "ocr_backend": service.ocr_backend.name,
+                "python": platform.python_version(),
+                "opencv": cv2.__version__,
+                "numpy": np.__version__,
+                "cpus": os.cpu_count(),
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "documents": len(manifest),
+                "repeat": args.repeat
+            },
+            "stages": run_benchmarks(data_dir, manifest, args.stages.split(","), args.repeat),
+            "peak_rss_mb": peak_rss_mb()
+        }
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+        regressed = any(stage["regression"] for stage in report["comparison"].values())
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
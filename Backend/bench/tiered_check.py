@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from bench.generate import generate_corpus
+
+METRICS = ["ela_score", "edge_density", "noise_variance"]
+
+
+def relative_error(preview: float, full: float) -> float:
+    return abs(preview - full) / max(abs(full), 1e-9)
+
+
+def check_page(image: np.ndarray) -> Dict:
+    """Calibrated preview vs full-resolution tampering results for one page"""
+    import main
+
+    # The tiered path runs copy-move on the full page for the preview tier too
+    duplicates = main.find_page_copy_move(main.page_analysis(image).gray)
+    preview, scale = main.tampering_preview(image)
+    quick = main.detect_tampering(preview, main.page_analysis(preview, scratch="preview"),
+                                  tier="preview", scale=scale, duplicates=duplicates)
+    full = main.detect_tampering(image, tier="full")
+    tiered = main.detect_tampering_tiered(image)
+
+    return {
+        "scale": round(scale, 3),
+        "metrics": {name: {"full": full["metrics"][name], "preview": quick["metrics"][name],
+                           "relative_error": round(relative_error(quick["metrics"][name],
+                                                                  full["metrics"][name]), 3)}
+                    for name in METRICS},
+        "score": {"full": full["authenticity_score"], "preview": quick["authenticity_score"]},
+        "missed_issues": sorted(set(full["issues"]) - set(quick["issues"])),
+        "extra_issues": sorted(set(quick["issues"]) - set(full["issues"])),
+        "tier": tiered["tier"],
+        # Issues the tiered verdict gets wrong (missed or extra) against the full-resolution one
+        "tiered_differs": sorted(set(full["issues"]) ^ set(tiered["issues"]))
+    }
+
+
+def run_checks(data_dir: str, manifest: List[Dict], score_tolerance: float,
+               min_preview_exits: float) -> Dict:
+    import main
+
+    failures = []
+    pages = {}
+    untampered = []
+    for entry in manifest:
+        if entry["kind"] != "image":
+            continue
+        image = main.load_image(os.path.join(data_dir, entry["file"]))
+        if max(image.shape[:2]) <= main.TAMPERING_PREVIEW_SIDE:
+            continue  # scored at full resolution anyway
+        report = check_page(image)
+        pages[entry["file"]] = report
+        if entry["variant"] != "tampered":
+            untampered.append(report)
+        scores = report["score"]
+        if abs(scores["preview"] - scores["full"]) > score_tolerance:
+            failures.append(f"{entry['file']}: preview score {scores['preview']} vs "
+                            f"{scores['full']} at full resolution")
+        if report["missed_issues"]:
+            failures.append(f"{entry['file']}: preview misses {', '.join(report['missed_issues'])}")
+        if report["tiered_differs"]:
+            failures.append(f"{entry['file']}: tiered verdict differs from the full one on "
+                            f"{', '.join(report['tiered_differs'])}")
+
+    escalated = sum(page["tier"] == "full" for page in pages.values())
+    # Tiered mode only pays off if untampered pages stop at the preview
+    preview_exits = sum(page["tier"] == "preview" for page in untampered) / max(len(untampered), 1)
+    if untampered and preview_exits < min_preview_exits:
+        failures.append(f"only {preview_exits:.0%} of untampered pages kept the preview verdict "
+                        f"(minimum {min_preview_exits:.0%})")
+    return {"preview_side": main.TAMPERING_PREVIEW_SIDE, "clean_score": main.TAMPERING_CLEAN_SCORE,
+            "pages_checked": len(pages), "escalated": escalated,
+            "untampered_preview_exits": round(preview_exits, 3), "pages": pages, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check tiered tampering analysis against the full-resolution path")
+    parser.add_argument("--data", help="existing corpus from bench.generate (default: generate a fresh one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="medium,large", help="pages above TAMPERING_PREVIEW_SIDE are checked")
+    parser.add_argument("--score-tolerance", type=float, default=10.0,
+                        help="max preview vs full score difference")
+    parser.add_argument("--min-preview-exits", type=float, default=0.8,
+                        help="min share of untampered pages that keep the preview verdict")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="bench-")
+    try:
+        if args.data:
+            with open(os.path.join(data_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        else:
+            manifest = generate_corpus(data_dir, args.seed, args.sizes.split(","), pdf_pages=())
+        report = run_checks(data_dir, manifest, args.score_tolerance, args.min_preview_exits)
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in report["failures"]:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
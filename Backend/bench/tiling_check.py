@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from bench.generate import generate_corpus
+
+METRICS = ["ela_score", "laplacian_var", "edge_density"]
+VARIANTS = ["fast", "denoised", "otsu"]
+
+
+def relative_error(tiled: float, full: float) -> float:
+    return abs(tiled - full) / max(abs(full), 1e-9)
+
+
+def check_page(image: np.ndarray, tile: int, pool) -> Dict:
+    """Tiled vs whole-image metrics and preprocessing output for one page"""
+    import main
+    from analysis import PageAnalysis
+
+    full = PageAnalysis(image, scratch="check.full")
+    tiled = PageAnalysis(image, scratch="check.tiled", tile=tile, pool=pool)
+    report = {"metrics": {}, "pixels": {}}
+    for name in METRICS:
+        expected = full.ela_score() if name == "ela_score" else getattr(full, name)
+        actual = tiled.ela_score() if name == "ela_score" else getattr(tiled, name)
+        report["metrics"][name] = {"full": round(expected, 4), "tiled": round(actual, 4),
+                                   "relative_error": round(relative_error(actual, expected), 5)}
+    for variant in VARIANTS:
+        expected = main.preprocess_image(image, full, variant)
+        actual = main.preprocess_image(image, tiled, variant)
+        report["pixels"][variant] = round(float(np.mean(expected == actual)), 6)
+    full_score = main.detect_tampering(image, PageAnalysis(image, scratch="check.full"),
+                                       tier="full")["authenticity_score"]
+    tiled_score = main.detect_tampering(image, PageAnalysis(image, scratch="check.tiled", tile=tile, pool=pool),
+                                        tier="full")["authenticity_score"]
+    report["tampering_score"] = {"full": full_score, "tiled": tiled_score}
+    return report
+
+
+def run_checks(data_dir: str, manifest: List[Dict], tile: int, workers: int,
+               metric_tolerance: float, pixel_agreement: float, score_tolerance: float) -> Dict:
+    import main
+
+    failures = []
+    pages = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entry in manifest:
+            if entry["kind"] != "image":
+                continue
+            image = main.load_image(os.path.join(data_dir, entry["file"]))
+            report = check_page(image, tile, pool)
+            pages[entry["file"]] = report
+            for name, values in report["metrics"].items():
+                if values["relative_error"] > metric_tolerance:
+                    failures.append(f"{entry['file']}: {name} off by {values['relative_error']:.2%}")
+            for variant, agreement in report["pixels"].items():
+                if agreement < pixel_agreement:
+                    failures.append(f"{entry['file']}: {variant} preprocessing agrees on {agreement:.4%} of pixels")
+            scores = report["tampering_score"]
+            if abs(scores["full"] - scores["tiled"]) > score_tolerance:
+                failures.append(f"{entry['file']}: tampering score {scores['tiled']} vs {scores['full']}")
+    return {"tile": tile, "pages": pages, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check tiled page analysis against the whole-image path")
+    parser.add_argument("--data", help="existing corpus from bench.generate (default: generate a fresh one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--tile", type=int, default=256, help="tile side in px (rounded down to 16)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--metric-tolerance", type=float, default=0.01, help="max relative metric error")
+    parser.add_argument("--pixel-agreement", type=float, default=0.999, help="min share of identical pixels")
+    parser.add_argument("--score-tolerance", type=float, default=1.0, help="max tampering score difference")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="bench-")
+    try:
+        if args.data:
+            with open(os.path.join(data_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        else:
+            manifest = generate_corpus(data_dir, args.seed, args.sizes.split(","), pdf_pages=())
+        report = run_checks(data_dir, manifest, max(16, args.tile // 16 * 16), args.workers,
+                            args.metric_tolerance, args.pixel_agreement, args.score_tolerance)
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in report["failures"]:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
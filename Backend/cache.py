@@ -0,0 +1,115 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """In-memory LRU with an optional SQLite tier, TTL expiry and hit/miss counters"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400,
+                 db_path: Optional[str] = None, max_db_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_db_bytes = max_db_bytes
+
+        self._memory = OrderedDict()  # key -> (expires_at, json string)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_bytes = 0
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            self._db_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        return self._db
+
+    def _remember(self, key: str, expires_at: float, payload: str):
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh copy of the cached value, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return json.loads(entry[1])
+                del self._memory[key]
+
+            if self.db_path:
+                db = self._connect()
+                row = db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[1], row[0])
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict):
+        now = time.time()
+        expires_at = now + self.ttl
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, expires_at, payload)
+
+            if self.db_path:
+                db = self._connect()
+                old = db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                           (key, payload, len(payload), expires_at, now))
+                self._db_bytes += len(payload) - (old[0] if old else 0)
+                self._evict_disk(db, now)
+                db.commit()
+
+    def _evict_disk(self, db: sqlite3.Connection, now: float):
+        if self._db_bytes <= self.max_db_bytes:
+            return
+        freed = db.execute("SELECT COALESCE(SUM(size), 0) FROM cache WHERE expires_at < ?", (now,)).fetchone()[0]
+        db.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        self._db_bytes -= freed
+
+        # Still over budget - drop least recently used rows
+        for key, size in db.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if self._db_bytes <= self.max_db_bytes:
+                break
+            db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db_bytes -= size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._db_bytes if self.db_path else 0
+            }
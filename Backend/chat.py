@@ -1,28 +1,31 @@
+import asyncio
 import os
 import uuid
 import tempfile
-import requests
 import json
 from pathlib import Path
 from datetime import datetime
-import uvicorn
 from typing import List, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-import speech_recognition as sr
-from gtts import gTTS
 from dotenv import load_dotenv
 
+from llm_client import get_llm_client
+from startup import WarmUp, lazy_import, preload
+
+# Speech libraries load on first use (or during warm-up) - see LAZY_IMPORTS
+sr = lazy_import("speech_recognition")
+gtts = lazy_import("gtts")
+
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your_api_key_here")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Shared Groq client (GROQ_API_KEY / GROQ_BASE_URL) - pooled connections, retries, rate limiting
+llm_client = get_llm_client()
 
 app = FastAPI(title="Scholarship Platform Help Desk Chatbot")
 
@@ -35,6 +38,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Spoken replies via gTTS (a Google service) - turn off for offline load tests
+TTS_ENABLED = os.getenv("TTS_ENABLED", "true").lower() == "true"
+
 # Audio files directory
 UPLOAD_DIR = Path("audio_files")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -52,12 +58,14 @@ class ScholarshipQueryModel(BaseModel):
 
 def text_to_speech(text, lang='en'):
     """Convert text to speech and save as an audio file."""
+    if not TTS_ENABLED:
+        return None
     try:
         audio_filename = f"scholarship_help_{uuid.uuid4()}.mp3"
         filepath = UPLOAD_DIR / audio_filename
         
         tts_text = text[:800] if len(text) > 800 else text
-        tts = gTTS(text=tts_text, lang=lang, slow=False)
+        tts = gtts.gTTS(text=tts_text, lang=lang, slow=False)
         tts.save(str(filepath))
         
         return audio_filename
@@ -65,15 +73,14 @@ def text_to_speech(text, lang='en'):
         print(f"Text-to-speech error: {e}")
         return None
 
-def generate_scholarship_response(message, user_role="student"):
-    """Generate scholarship help desk response using Groq API."""
-    try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        system_prompt = f"""You are ScholarBot, an intelligent help desk assistant for a blockchain-based scholarship platform.
+FALLBACK_RESPONSE = "I'm experiencing technical difficulties. Please contact our support team at support@scholarshipplatform.com or try again later."
+
+# Keeps proxies (nginx) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def scholarship_messages(message, user_role="student"):
+    """Chat messages for a help desk question."""
+    system_prompt = f"""You are ScholarBot, an intelligent help desk assistant for a blockchain-based scholarship platform.
 
 PLATFORM OVERVIEW:
 - AI-powered document verification system
@@ -148,31 +155,58 @@ GUIDELINES:
 - Include relevant links or next steps
 - If the query is beyond your scope, direct to appropriate support channel"""
 
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 1200
-        }
-        
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": message}
+    ]
+
+async def generate_scholarship_response(message, user_role="student"):
+    """Generate scholarship help desk response using Groq API."""
+    try:
+        return await llm_client.complete(scholarship_messages(message, user_role), temperature=0.3, max_tokens=1200)
     except Exception as e:
         print(f"Groq API error: {e}")
-        return "I'm experiencing technical difficulties. Please contact our support team at support@scholarshipplatform.com or try again later."
+        return FALLBACK_RESPONSE
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_scholarship_response(request: Request, message, user_role, text_key, fields, with_audio=False):
+    """Server-sent events: a `token` per Groq delta, then `done` with the full reply
+    (or `error`), then `audio` once the spoken reply is ready."""
+    chunks = []
+    tokens = llm_client.stream(scholarship_messages(message, user_role), temperature=0.3, max_tokens=1200)
+    try:
+        async for token in tokens:
+            chunks.append(token)
+            yield sse_event("token", {"text": token})
+    except Exception as e:
+        print(f"Groq API error: {e}")
+        yield sse_event("error", {"error": str(e), text_key: FALLBACK_RESPONSE})
+        return
+    finally:
+        # Also runs when the client disconnects - closes the upstream Groq stream
+        await tokens.aclose()
+    
+    response_text = "".join(chunks)
+    yield sse_event("done", {text_key: response_text, "timestamp": datetime.now().isoformat(), **fields})
+    
+    if with_audio and not await request.is_disconnected():
+        audio_filename = await asyncio.to_thread(text_to_speech, response_text, 'en')
+        yield sse_event("audio", {"audio_file_path": audio_filename})
 
 @app.post("/chat")
-async def scholarship_chat(query: QueryModel):
+async def scholarship_chat(query: QueryModel, request: Request, stream: bool = Query(False)):
     """Process scholarship help desk chat messages."""
+    if stream:
+        events = stream_scholarship_response(request, query.message, query.user_role, "text_response",
+                                             {"user_role": query.user_role}, with_audio=True)
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+    
     try:
-        response_text = generate_scholarship_response(query.message, query.user_role)
-        audio_filename = text_to_speech(response_text, 'en')
+        response_text = await generate_scholarship_response(query.message, query.user_role)
+        # gTTS blocks on its HTTP call - keep it off the event loop
+        audio_filename = await asyncio.to_thread(text_to_speech, response_text, 'en')
         
         return {
             "text_response": response_text,
@@ -188,13 +222,17 @@ async def scholarship_chat(query: QueryModel):
         }
 
 @app.post("/scholarship-query")
-async def handle_scholarship_query(query: ScholarshipQueryModel):
+async def handle_scholarship_query(query: ScholarshipQueryModel, request: Request, stream: bool = Query(False)):
     """Handle categorized scholarship queries."""
+    # Format question based on query type
+    formatted_query = f"[{query.query_type.upper()}] {query.question}"
+    if stream:
+        events = stream_scholarship_response(request, formatted_query, query.user_role, "answer",
+                                             {"query_type": query.query_type, "user_role": query.user_role})
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+    
     try:
-        # Format question based on query type
-        formatted_query = f"[{query.query_type.upper()}] {query.question}"
-        
-        response_text = generate_scholarship_response(formatted_query, query.user_role)
+        response_text = await generate_scholarship_response(formatted_query, query.user_role)
         
         return {
             "query_type": query.query_type,
@@ -208,6 +246,13 @@ async def handle_scholarship_query(query: ScholarshipQueryModel):
             "answer": "Please contact our support team for assistance with your query."
         }
 
+def transcribe(path):
+    """Speech to text via Google's recognizer (blocking - run it in a thread)"""
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(path) as source:
+        audio = recognizer.record(source)
+    return recognizer.recognize_google(audio, language='en-US')
+
 @app.post("/voice-input")
 async def process_voice(file: UploadFile = File(...)):
     """Process voice input and generate response."""
@@ -217,13 +262,9 @@ async def process_voice(file: UploadFile = File(...)):
         temp_file.write(content)
         temp_file.close()
 
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(temp_file.name) as source:
-            audio = recognizer.record(source)
-        
-        transcribed_text = recognizer.recognize_google(audio, language='en-US')
-        response_text = generate_scholarship_response(transcribed_text)
-        audio_filename = text_to_speech(response_text, 'en')
+        transcribed_text = await asyncio.to_thread(transcribe, temp_file.name)
+        response_text = await generate_scholarship_response(transcribed_text)
+        audio_filename = await asyncio.to_thread(text_to_speech, response_text, 'en')
 
         return {
             "transcribed_text": transcribed_text,
@@ -240,6 +281,24 @@ async def process_voice(file: UploadFile = File(...)):
         if os.path.exists(temp_file.name):
             os.unlink(temp_file.name)
 
+def warm_speech():
+    preload(sr, gtts)
+
+# Run before /health/ready reports ready (WARMUP_MODE)
+warmup = WarmUp([
+    ("imports", warm_speech),
+    ("llm_client", llm_client.warm)
+])
+
+@app.on_event("startup")
+async def start_warmup():
+    await warmup.start()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    warmup.stop()
+    await llm_client.close()
+
 @app.get("/audio/{filename}")
 async def get_audio(filename: str):
     """Retrieve audio files."""
@@ -334,18 +393,31 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Warm-up finished and the chatbot can take traffic"""
+    if not warmup.ready:
+        return JSONResponse(warmup.status(), status_code=503, headers={"Retry-After": "5"})
+    return warmup.status()
+
 @app.get("/")
 async def root():
     return {
         "message": "Welcome to Scholarship Platform Help Desk",
         "description": "AI-powered chatbot to assist with scholarship queries",
         "endpoints": {
-            "chat": "/chat - General chat interface",
-            "scholarship_query": "/scholarship-query - Categorized queries",
+            "chat": "/chat - General chat interface (?stream=true for server-sent events)",
+            "scholarship_query": "/scholarship-query - Categorized queries (?stream=true for server-sent events)",
             "voice": "/voice-input - Voice-based queries",
             "faq": "/faq - Frequently asked questions",
             "platform_info": "/platform-info - Platform details",
-            "health": "/health-check - Service health status"
+            "health": "/health-check - Service health status",
+            "readiness": "/health/ready - Warm-up status for load balancers"
         },
         "supported_query_types": [
             "registration",
@@ -357,6 +429,7 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import uvicorn
     
     print("Starting Scholarship Platform Help Desk Chatbot...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def ink_mask(gray: np.ndarray, contrast: int = 48, rule: int = 64) -> np.ndarray:
+    """Pixels on strong edges (text, stamps, photos), minus long straight ruled lines.
+
+    Table rules and page borders repeat at every offset along their length, so
+    they would "match" any horizontal or vertical shift and are removed.
+    """
+    kernel = np.ones((3, 3), np.uint8)
+    edges = cv2.compare(cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel), contrast, cv2.CMP_GE)
+    lines = cv2.bitwise_or(cv2.morphologyEx(edges, cv2.MORPH_OPEN, np.ones((1, rule), np.uint8)),
+                           cv2.morphologyEx(edges, cv2.MORPH_OPEN, np.ones((rule, 1), np.uint8)))
+    return cv2.subtract(edges, cv2.dilate(lines, kernel))
+
+
+def block_features(gray: np.ndarray, side: int, block_cells: int, quant: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Quantized cell-mean signature of a block around every glyph: (features, centres, text height).
+
+    Blocks are anchored on dark connected components (glyphs, stamp strokes)
+    rather than a fixed grid, so a copy at any offset yields blocks at the same
+    spot within the copied content. The page is first reduced so its longer
+    side is at most `side` px; cells are half the median glyph height and cell
+    means are sampled bilinearly at the sub-pixel glyph centres, so the phase
+    lost to the reduction does not change the signature. Centres and text
+    height are returned in full-resolution pixels.
+    """
+    h, w = gray.shape
+    factor = max(1, -(-max(h, w) // side))
+    small = cv2.resize(gray, (w // factor, h // factor), interpolation=cv2.INTER_AREA) if factor > 1 else gray
+    empty = np.empty((0, block_cells * block_cells), np.uint8), np.empty((0, 2), np.int64), 0.0
+
+    _, dark = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    _, _, stats, centres = cv2.connectedComponentsWithStats(dark, connectivity=8)
+    stats, centres = stats[1:], centres[1:]
+    # Specks, and frames or rules spanning a large part of the page, are not glyphs
+    glyph = ((stats[:, cv2.CC_STAT_AREA] >= 4) & (stats[:, cv2.CC_STAT_WIDTH] < small.shape[1] // 4)
+             & (stats[:, cv2.CC_STAT_HEIGHT] < small.shape[0] // 4))
+    if glyph.sum() < 2:
+        return empty
+    height = float(np.median(stats[glyph, cv2.CC_STAT_HEIGHT]))
+    cell = max(2, int(height) // 2)
+
+    offsets = (np.arange(block_cells) - (block_cells - 1) / 2) * cell
+    cy, cx = centres[glyph, 1], centres[glyph, 0]
+    reach = offsets[-1] + cell
+    inside = (cy >= reach) & (cx >= reach) & (cy < small.shape[0] - reach) & (cx < small.shape[1] - reach)
+    cy, cx = cy[inside], cx[inside]
+    if len(cy) < 2:
+        return empty
+
+    means = cv2.blur(small.astype(np.float32), (cell, cell))
+    map_y = np.repeat(cy[:, None] + offsets, block_cells, axis=1).astype(np.float32)
+    map_x = np.tile(cx[:, None] + offsets, block_cells).astype(np.float32)
+    features = (cv2.remap(means, map_x, map_y, cv2.INTER_LINEAR) // quant).astype(np.uint8)
+    # A reduced pixel covers `factor` full-resolution pixels
+    centres = np.stack([np.round((cy + 0.5) * factor - 0.5), np.round((cx + 0.5) * factor - 0.5)], axis=1)
+    return features, centres.astype(np.int64), height * factor
+
+
+def vote(shifts: np.ndarray, top: int) -> List[Tuple[Tuple[int, int], int]]:
+    """Most supported shifts, each counting the pairs within 1 px of it: [((dy, dx), votes), ...]"""
+    unique, counts = np.unique(shifts, axis=0, return_counts=True)
+    # One integer per shift, so neighbouring shifts can be looked up with searchsorted
+    span = 2 * int(np.abs(unique).max(initial=0)) + 3
+    keys = unique[:, 0] * span + unique[:, 1]
+    support = np.zeros(len(keys), np.int64)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            wanted = keys + dy * span + dx
+            found = np.clip(np.searchsorted(keys, wanted), 0, len(keys) - 1)
+            support += np.where(keys[found] == wanted, counts[found], 0)
+
+    best, taken = [], np.zeros(len(unique), bool)
+    for i in np.lexsort((-counts, -support)):
+        if len(best) >= top:
+            break
+        if taken[i]:
+            continue
+        taken |= np.abs(unique - unique[i]).max(axis=1) <= 1
+        best.append((tuple(int(v) for v in unique[i]), int(support[i])))
+    return best
+
+
+def candidate_shifts(gray: np.ndarray, side: int = 1280, block_cells: int = 4, quant: int = 16,
+                     tolerance: int = 1, window: int = 8, min_shift: int = 64, top: int = 5) -> Dict:
+    """Most common offsets between near-identical blocks, with the blocks that voted for each.
+
+    Blocks are lexicographically sorted by signature so near-duplicates end up
+    within `window` places of each other; every such pair at least `min_shift`
+    px (and one block) apart votes for its offset.
+    """
+    features, centres, height = block_features(gray, side, block_cells, quant)
+    result = {"candidates": [], "blocks": int(len(features)), "pairs": 0, "text_height": height}
+    if len(features) < 2:
+        return result
+
+    # Big-endian byte packing keeps the lexicographic order of the signature
+    packed = np.zeros((len(features), 16), np.uint8)
+    packed[:, :min(16, features.shape[1])] = features[:, :16]
+    keys = packed.view('>u8')
+    order = np.lexsort((keys[:, 1], keys[:, 0]))
+    features, centres = features[order].astype(np.int16), centres[order]
+
+    sources, shifts = [], []
+    for step in range(1, min(window, len(features) - 1) + 1):
+        close = np.abs(features[step:] - features[:-step]).max(axis=1) <= tolerance
+        sources.append(centres[:-step][close])
+        shifts.append(centres[step:][close] - centres[:-step][close])
+    sources, shifts = np.concatenate(sources), np.concatenate(shifts)
+    # Overlapping neighbours of the same region are trivially similar
+    far = np.abs(shifts).max(axis=1) >= max(min_shift, block_cells * height / 2)
+    sources, shifts = sources[far], shifts[far]
+    result["pairs"] = int(len(shifts))
+    if not len(shifts):
+        return result
+
+    # (dy, dx) and (-dy, -dx) are the same copy - normalise the direction,
+    # keeping each vote's source block on the near side
+    flip = (shifts[:, 0] < 0) | ((shifts[:, 0] == 0) & (shifts[:, 1] < 0))
+    sources[flip] += shifts[flip]
+    shifts[flip] *= -1
+    for shift, votes in vote(shifts, top):
+        near = np.abs(shifts - shift).max(axis=1) <= 1
+        result["candidates"].append({"shift": shift, "votes": votes, "sources": sources[near]})
+    return result
+
+
+def refine_shift(gray: np.ndarray, shift: Tuple[int, int], sources: np.ndarray, size: int, reach: int,
+                 limit: int = 8) -> Tuple[int, int]:
+    """Shift within `reach` px of `shift` that best lines up the `size` px patches around `sources`.
+
+    Block centres come from the reduced page, so a voted shift can be off by
+    about one reduced pixel; the copy itself is an exact whole-pixel offset.
+    """
+    h, w = gray.shape
+    half = size // 2
+    total = None
+    for y, x in sources[:limit]:
+        ty, tx = y + shift[0], x + shift[1]
+        if (min(y, ty) - half - reach < 0 or min(x, tx) - half - reach < 0
+                or max(y, ty) + half + reach >= h or max(x, tx) + half + reach >= w):
+            continue
+        patch = gray[y - half:y + half + 1, x - half:x + half + 1]
+        around = gray[ty - half - reach:ty + half + reach + 1, tx - half - reach:tx + half + reach + 1]
+        cost = cv2.matchTemplate(around, patch, cv2.TM_SQDIFF)
+        total = cost if total is None else total + cost
+    if total is None:
+        return shift
+    dy, dx = np.unravel_index(int(np.argmin(total)), total.shape)
+    return shift[0] + int(dy) - reach, shift[1] + int(dx) - reach
+
+
+def duplicated_area(gray: np.ndarray, shift: Tuple[int, int], cell: int = 8, tolerance: int = 24,
+                    grow: Tuple[int, int] = (3, 3),
+                    window: Optional[Tuple[int, int, int, int]] = None) -> Tuple[int, int]:
+    """(matched cells, pixel area) of the largest region that repeats at `shift`.
+
+    The page (or the (top, bottom, left, right) `window` of it) is compared
+    with itself moved by `shift`; a cell matches when it holds ink and at most
+    a tenth of its ink pixels differ by more than `tolerance` grey levels.
+    Matched cells within `grow` (rows, columns) cells of each other are joined,
+    and the largest joined region is the copied area.
+    """
+    dy, dx = shift
+    h, w = gray.shape
+    top, bottom, left, right = window or (0, h, 0, w)
+    # Keep both the window and its moved copy on the page
+    top, bottom = max(top, 0, -dy), min(bottom, h, h - dy)
+    left, right = max(left, 0, -dx), min(right, w, w - dx)
+    rows, cols = (bottom - top) // cell, (right - left) // cell
+    if rows < 1 or cols < 1:
+        return 0, 0
+    bottom, right = top + rows * cell, left + cols * cell
+    base = gray[top:bottom, left:right]
+    moved = gray[top + dy:bottom + dy, left + dx:right + dx]
+    inked = cv2.bitwise_or(ink_mask(base), ink_mask(moved))
+    differs = cv2.bitwise_and(inked, cv2.compare(cv2.absdiff(moved, base), tolerance, cv2.CMP_GT))
+
+    # INTER_AREA is an exact box average for integer factors: per-cell ink share
+    ink_share = cv2.resize(inked, (cols, rows), interpolation=cv2.INTER_AREA).astype(np.int32)
+    differ_share = cv2.resize(differs, (cols, rows), interpolation=cv2.INTER_AREA).astype(np.int32)
+    matched = (ink_share >= 255 * 4 // (cell * cell)) & (differ_share * 10 <= ink_share)
+
+    joined = cv2.dilate(matched.astype(np.uint8), np.ones((2 * grow[0] + 1, 2 * grow[1] + 1), np.uint8))
+    count, labels = cv2.connectedComponents(joined, connectivity=8)
+    if count <= 1:
+        return 0, 0
+    sizes = np.bincount(labels[matched], minlength=count)
+    sizes[0] = 0
+    cells = int(sizes.max())
+    return cells, cells * cell * cell
+
+
+def find_copy_move(gray: np.ndarray, cell: int = 8, side: int = 1280, min_shift: int = 64,
+                   candidates: int = 5, tolerance: int = 24) -> Dict:
+    """Find the largest region copied elsewhere on the page, at any offset.
+
+    Sorted block signatures propose a few candidate offsets cheaply; each is
+    snapped to the exact pixel offset and verified pixel by pixel around the
+    blocks that voted for it, so the reported area is content that really
+    repeats. `text_area` is that area in squares of the page's text height,
+    which reads the same at any scan resolution.
+    """
+    proposed = candidate_shifts(gray, side=side, min_shift=min_shift, top=candidates)
+    height = proposed["text_height"]
+    result = {"matches": 0, "shift": [0, 0], "matched_area": 0, "text_area": 0.0,
+              "candidate_pairs": proposed["pairs"], "blocks": proposed["blocks"],
+              "text_height": round(height, 1), "candidates": []}
+    if not proposed["candidates"]:
+        return result
+
+    factor = max(1, -(-max(gray.shape) // side))
+    # Words on a line and neighbouring lines are joined into one region
+    grow = (max(1, round(1.5 * height / cell)), max(1, round(0.5 * height / cell)))
+    margin = int(3 * height)
+    for candidate in proposed["candidates"]:
+        sources = candidate["sources"]
+        shift = refine_shift(gray, candidate["shift"], sources, size=int(2 * height) | 1, reach=factor)
+        window = (int(sources[:, 0].min()) - margin, int(sources[:, 0].max()) + margin,
+                  int(sources[:, 1].min()) - margin, int(sources[:, 1].max()) + margin)
+        matches, area = duplicated_area(gray, shift, cell=cell, tolerance=tolerance, grow=grow, window=window)
+        text_area = round(area / height ** 2, 2)
+        result["candidates"].append({"shift": list(shift), "votes": candidate["votes"], "matched_area": area,
+                                     "text_area": text_area})
+        if area > result["matched_area"]:
+            result.update(matches=matches, shift=list(shift), matched_area=area, text_area=text_area)
+    return result
@@ -0,0 +1,299 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from doc_rules import normalize_text
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Multi-index hashing: the 64-bit pHash is split into four 16-bit chunks, each
+# indexed in SQLite. Two hashes within Hamming distance 7 must agree on some
+# chunk to within one bit, so probing every chunk value and its 16 one-bit
+# neighbours finds all of them without scanning the table.
+CHUNKS = 4
+CHUNK_BITS = 16
+MAX_SEARCH_DISTANCE = 2 * CHUNKS - 1
+
+# Content fingerprint: a TILE_GRID x TILE_GRID grid of tiles, each kept as
+# a TILE_SIDE x TILE_SIDE thumbnail. Two tiles match when no thumbnail pixel
+# differs by more than TILE_MAX_DIFFERENCE grey levels; tiles with less
+# contrast than TILE_MIN_CONTRAST are blank.
+TILE_GRID = 16
+TILE_SIDE = 8
+TILE_MAX_DIFFERENCE = 12
+TILE_MIN_CONTRAST = 16
+
+
+def _pack(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash(small: np.ndarray) -> int:
+    """64-bit DCT perceptual hash of a 32x32 thumbnail"""
+    low = cv2.dct(small.astype(np.float32))[:8, :8].ravel()
+    # The DC term is the mean brightness - left out of the threshold
+    return _pack(low > np.median(low[1:]))
+
+
+def dhash(small: np.ndarray) -> int:
+    """64-bit difference hash (horizontal gradient signs) of a thumbnail"""
+    tiny = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _pack((tiny[:, 1:] > tiny[:, :-1]).ravel())
+
+
+def tile_thumbnails(gray: np.ndarray) -> np.ndarray:
+    """TILE_SIDE x TILE_SIDE thumbnail of each tile, row by row, flattened"""
+    side = TILE_GRID * TILE_SIDE
+    # Resizing the page once box-averages every tile exactly as resizing the tiles one by one would
+    thumb = cv2.resize(gray, (side, side), interpolation=cv2.INTER_AREA)
+    return thumb.reshape(TILE_GRID, TILE_SIDE, TILE_GRID, TILE_SIDE).transpose(0, 2, 1, 3).reshape(
+        TILE_GRID * TILE_GRID, TILE_SIDE * TILE_SIDE)
+
+
+def page_fingerprint(gray: np.ndarray) -> Dict:
+    # One pass over the full page, and both hashes work from the same thumbnail.
+    # INTER_AREA has a fast path for integer factors, so box-average down to
+    # about 64 px first (dropping under `factor` px of margin) and finish from there
+    factor = max(1, min(gray.shape[:2]) // 64)
+    height, width = gray.shape[0] // factor * factor, gray.shape[1] // factor * factor
+    reduced = cv2.resize(gray[:height, :width], (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+    small = cv2.resize(reduced, (32, 32), interpolation=cv2.INTER_AREA)
+    # Tiles come from the full page - resizing the ~64 px copy again would blur the field text
+    return {"phash": phash(small), "dhash": dhash(small), "tiles": tile_thumbnails(gray)}
+
+
+def _pack_tiles(tiles: Optional[np.ndarray]) -> Optional[bytes]:
+    # Mostly blank paper - compresses to a few kB
+    return None if tiles is None else zlib.compress(np.asarray(tiles, np.uint8).tobytes())
+
+
+def _unpack_tiles(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    return np.frombuffer(zlib.decompress(blob), np.uint8).reshape(TILE_GRID * TILE_GRID, -1) if blob else None
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def _chunks(value: int) -> List[int]:
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * i)) & mask for i in range(CHUNKS)]
+
+
+def normalize_number(number: str) -> str:
+    return "".join(ch for ch in number.upper() if ch.isalnum())
+
+
+def normalize_holder(name: Optional[str]) -> Optional[str]:
+    if not isinstance(name, str):
+        return None
+    return normalize_text(name) or None
+
+
+class DuplicateIndex:
+    """Persistent index of page fingerprints and document numbers from past uploads"""
+
+    def __init__(self, db_path: str = ":memory:", max_distance: int = 6, max_dhash_distance: int = 10,
+                 max_matches: int = 10, template_peers: int = 2, min_content_share: float = 0.5):
+        self.max_distance = min(max_distance, MAX_SEARCH_DISTANCE)
+        self.max_dhash_distance = max_dhash_distance
+        self.max_matches = max_matches
+        self.template_peers = template_peers
+        self.min_content_share = min_content_share
+        directory = os.path.dirname(db_path) if db_path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY, sha256 TEXT NOT NULL, applicant_id TEXT, filename TEXT,"
+            " document_type TEXT, decision TEXT, seen_at REAL NOT NULL, holder TEXT);"
+            "CREATE INDEX IF NOT EXISTS documents_sha ON documents (sha256);"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " doc_id INTEGER NOT NULL, page INTEGER NOT NULL, phash INTEGER NOT NULL, dhash INTEGER NOT NULL,"
+            " c0 INTEGER NOT NULL, c1 INTEGER NOT NULL, c2 INTEGER NOT NULL, c3 INTEGER NOT NULL, tiles BLOB);"
+            "CREATE INDEX IF NOT EXISTS pages_c0 ON pages (c0);"
+            "CREATE INDEX IF NOT EXISTS pages_c1 ON pages (c1);"
+            "CREATE INDEX IF NOT EXISTS pages_c2 ON pages (c2);"
+            "CREATE INDEX IF NOT EXISTS pages_c3 ON pages (c3);"
+            "CREATE INDEX IF NOT EXISTS pages_doc ON pages (doc_id);"
+            "CREATE TABLE IF NOT EXISTS numbers (number TEXT NOT NULL, doc_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS numbers_number ON numbers (number);"
+        )
+        # Indexes created before holder names and tiles were recorded
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(documents)")]
+        if "holder" not in columns:
+            self._db.execute("ALTER TABLE documents ADD COLUMN holder TEXT")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(pages)")]
+        if "tiles" not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN tiles BLOB")
+        self._db.commit()
+
+    def stored_fingerprints(self, sha256: str) -> Optional[List[Dict]]:
+        """Fingerprints of an earlier upload with the same bytes (for verdict-cache hits)"""
+        with self._lock:
+            row = self._db.execute("SELECT id FROM documents WHERE sha256 = ? ORDER BY id LIMIT 1",
+                                   (sha256,)).fetchone()
+            if row is None:
+                return None
+            pages = self._db.execute("SELECT phash, dhash, tiles FROM pages WHERE doc_id = ? ORDER BY page",
+                                     (row[0],)).fetchall()
+        return [{"phash": _unsigned(p), "dhash": _unsigned(d), "tiles": _unpack_tiles(t)}
+                for p, d, t in pages]
+
+    def _page_candidates(self, fingerprint: Dict) -> List[tuple]:
+        queries, params = [], []
+        for i, chunk in enumerate(_chunks(fingerprint["phash"])):
+            probes = [chunk] + [chunk ^ (1 << bit) for bit in range(CHUNK_BITS)]
+            queries.append(f"SELECT doc_id, page, phash, dhash, tiles FROM pages "
+                           f"WHERE c{i} IN ({','.join('?' * len(probes))})")
+            params.extend(probes)
+        return self._db.execute(" UNION ".join(queries), params).fetchall()
+
+    def _content_matches(self, tiles: Optional[np.ndarray], candidates: List[tuple]) -> Dict[int, Dict]:
+        """Per candidate document: does the page repeat its filled-in content, not just its form?
+
+        Candidates are the pages the whole-page hash lookup found, which share
+        the page's layout. A tile that also matches at least half of the other
+        documents' pages (and `template_peers` of them) is part of the printed
+        form and is masked out; the page matches a document when it shares at
+        least `min_content_share` of its remaining non-blank tiles with it.
+        With fewer peers the form is not known yet and the answer is None.
+        """
+        known = [(doc_id, stored) for doc_id, stored in candidates if stored is not None]
+        if tiles is None or not known:
+            return {}
+        mine = np.asarray(tiles, np.int16)
+        doc_ids = np.array([doc_id for doc_id, _ in known])
+        inked = (mine.max(axis=1) - mine.min(axis=1)) >= TILE_MIN_CONTRAST
+        differences = np.abs(np.stack([stored for _, stored in known]).astype(np.int16) - mine).max(axis=2)
+        same = (differences <= TILE_MAX_DIFFERENCE) & inked
+        counts = same.sum(axis=0)
+
+        results = {}
+        for doc_id in set(doc_ids.tolist()):
+            own = doc_ids == doc_id
+            peers = int((~own).sum())
+            if peers < self.template_peers:
+                results[doc_id] = {"content_match": None}
+                continue
+            template = counts - same[own].sum(axis=0) >= max(self.template_peers, -(-peers // 2))
+            content = inked & ~template
+            shared = int((same[own].any(axis=0) & content).sum())
+            matched = bool(content.any() and shared >= self.min_content_share * content.sum())
+            results[doc_id] = {"content_match": matched, "content_tiles": int(content.sum()), "shared_tiles": shared}
+        return results
+
+    def find(self, fingerprints: List[Dict], numbers: List[str], applicant_id: Optional[str] = None,
+             holder: Optional[str] = None, sha256: Optional[str] = None) -> List[Dict]:
+        """Earlier documents sharing a document number, or a near-identical page
+        that repeats their filled-in content. Uploads by the same applicant are
+        not reported; without applicant IDs to compare, neither are byte-identical
+        re-uploads."""
+        hits = {}  # doc_id -> match details
+        with self._lock:
+            for page, fingerprint in enumerate(fingerprints):
+                candidates = self._page_candidates(fingerprint)
+                content = self._content_matches(fingerprint.get("tiles"),
+                                                [(doc_id, _unpack_tiles(tiles)) for doc_id, _, _, _, tiles in candidates])
+                for doc_id, prior_page, prior_phash, prior_dhash, _ in candidates:
+                    distance = (fingerprint["phash"] ^ _unsigned(prior_phash)).bit_count()
+                    dhash_distance = (fingerprint["dhash"] ^ _unsigned(prior_dhash)).bit_count()
+                    if distance > self.max_distance or dhash_distance > self.max_dhash_distance:
+                        continue
+                    found = content.get(doc_id, {"content_match": None})
+                    # Same form, different filled-in content
+                    if found["content_match"] is False:
+                        continue
+                    best = hits.get(doc_id)
+                    if best is None or best.get("distance", 99) > distance:
+                        hits[doc_id] = {"match": "page", "page": page, "prior_page": prior_page,
+                                        "distance": distance, "dhash_distance": dhash_distance, **found}
+
+            for number in {normalize_number(n) for n in numbers if n}:
+                for (doc_id,) in self._db.execute("SELECT doc_id FROM numbers WHERE number = ?", (number,)):
+                    match = hits.setdefault(doc_id, {"match": "document_number"})
+                    match.setdefault("numbers", []).append(number)
+
+            if not hits:
+                return []
+            ids = list(hits)
+            rows = self._db.execute(
+                f"SELECT id, applicant_id, filename, document_type, decision, seen_at, sha256, holder "
+                f"FROM documents WHERE id IN ({','.join('?' * len(ids))}) ORDER BY seen_at DESC", ids
+            ).fetchall()
+
+        holder = normalize_holder(holder)
+        matches = []
+        for doc_id, prior_applicant, filename, document_type, decision, seen_at, prior_sha256, prior_holder in rows:
+            if applicant_id is not None and prior_applicant is not None:
+                if prior_applicant == applicant_id:
+                    continue
+            elif sha256 is not None and prior_sha256 == sha256:
+                continue
+            match = hits[doc_id]
+            match["holder_match"] = holder is not None and prior_holder == holder
+            # Until the index holds enough pages of a form to tell its printed
+            # parts from the filled-in ones, the holder name breaks the tie
+            if "numbers" not in match and match.get("content_match") is None and not match["holder_match"]:
+                continue
+            matches.append({"applicant_id": prior_applicant, "filename": filename,
+                            "document_type": document_type, "decision": decision,
+                            "seen_at": seen_at, **match})
+        # Exact page copies first, then near-duplicates, then number-only matches
+        matches.sort(key=lambda m: m.get("distance", MAX_SEARCH_DISTANCE + 1))
+        return matches[:self.max_matches]
+
+    def add(self, sha256: str, fingerprints: List[Dict], numbers: List[str],
+            applicant_id: Optional[str] = None, filename: Optional[str] = None,
+            document_type: Optional[str] = None, decision: Optional[str] = None,
+            holder: Optional[str] = None) -> int:
+        """Record an upload; the same bytes from the same applicant update their existing entry"""
+        holder = normalize_holder(holder)
+        with self._lock:
+            row = self._db.execute("SELECT id FROM documents WHERE sha256 = ? AND applicant_id IS ? LIMIT 1",
+                                   (sha256, applicant_id)).fetchone()
+            if row is not None:
+                doc_id = row[0]
+                self._db.execute(
+                    "UPDATE documents SET filename = ?, document_type = ?, decision = ?, seen_at = ?, holder = ? "
+                    "WHERE id = ?", (filename, document_type, decision, time.time(), holder, doc_id)
+                )
+                # Same bytes, same pages - only the extracted numbers can change
+                self._db.execute("DELETE FROM numbers WHERE doc_id = ?", (doc_id,))
+            else:
+                cursor = self._db.execute(
+                    "INSERT INTO documents (sha256, applicant_id, filename, document_type, decision, seen_at, holder) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (sha256, applicant_id, filename, document_type, decision, time.time(), holder)
+                )
+                doc_id = cursor.lastrowid
+                self._db.executemany(
+                    "INSERT INTO pages (doc_id, page, phash, dhash, c0, c1, c2, c3, tiles) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(doc_id, page, _signed(fp["phash"]), _signed(fp["dhash"]), *_chunks(fp["phash"]),
+                      _pack_tiles(fp.get("tiles"))) for page, fp in enumerate(fingerprints)]
+                )
+            self._db.executemany(
+                "INSERT INTO numbers (number, doc_id) VALUES (?, ?)",
+                [(number, doc_id) for number in {normalize_number(n) for n in numbers if n}]
+            )
+            self._db.commit()
+        return doc_id
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
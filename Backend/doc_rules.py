@@ -0,0 +1,246 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+DOC_TYPE_NAMES = {
+    "aadhaar": "Aadhaar Card",
+    "pan": "PAN Card",
+    "marksheet": "Marksheet",
+    "income": "Income Certificate",
+    "caste": "Caste Certificate"
+}
+
+EXTRACTED_FIELDS = [
+    "name", "document_number", "dob", "father_name", "address", "marks", "roll_number",
+    "institution", "income_amount", "caste_category", "issue_date", "validity"
+]
+
+# DOC_PATTERNS field names -> extracted_data keys
+FIELD_ALIASES = {
+    "aadhaar_number": "document_number",
+    "pan_number": "document_number",
+    "certificate_number": "document_number",
+    "income": "income_amount",
+    "caste": "caste_category"
+}
+
+# Verhoeff tables - every genuine Aadhaar number carries a Verhoeff check digit
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6], [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4], [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2], [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8]
+]
+
+# PAN 4th character encodes the holder type (P = person, C = company, ...)
+PAN_RE = re.compile(r"\b[A-Z]{3}[PCHFATBLJG][A-Z]\d{4}[A-Z]\b")
+DATE_RE = re.compile(r"\b(\d{2}[/\-.]\d{2}[/\-.]\d{4})\b")
+DOB_RE = re.compile(r"(?:DOB|D\.O\.B\.?|Date of Birth|Year of Birth)\s*[:\-/]?\s*(\d{2}[/\-.]\d{2}[/\-.]\d{4}|\d{4})",
+                    re.IGNORECASE)
+NAME_RE = re.compile(r"^\s*Name\s*[:\-]?\s*([A-Za-z][A-Za-z .']{2,})$", re.IGNORECASE | re.MULTILINE)
+FATHER_RE = re.compile(r"Father'?s?\s*Name\s*[:\-]?\s*([A-Za-z][A-Za-z .']{2,})", re.IGNORECASE)
+NAME_LINE_RE = re.compile(r"^[A-Za-z][A-Za-z .']{2,40}$")
+WORD_RE = re.compile(r"[A-Za-z0-9]{2,}")
+NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token for English/OCR text)"""
+    return math.ceil(len(text) / 4)
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, punctuation and whitespace so re-scans of a page compare equal"""
+    return " ".join(NORMALIZE_RE.sub(" ", text.lower()).split())
+
+
+def is_low_information(line: str) -> bool:
+    """Tesseract noise: lines with almost no letters/digits or no real words"""
+    alnum = sum(ch.isalnum() for ch in line)
+    return alnum < 3 or alnum / len(line) < 0.5 or not WORD_RE.search(line)
+
+
+def verhoeff_valid(number: str) -> bool:
+    check = 0
+    for i, digit in enumerate(reversed(number)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+
+class DocumentClassifier:
+    """Local document classifier and field extractor built from DOC_PATTERNS.
+
+    Returns the same shape as ai_validate_document so callers can use either;
+    only the Aadhaar checksum and the PAN structure are strong enough evidence
+    to reach high confidence on their own, and only when no other type's
+    keywords appear.
+    """
+
+    def __init__(self, patterns: Dict):
+        self.patterns = patterns
+        self.number_res = {doc: re.compile(spec["number"], re.IGNORECASE) for doc, spec in patterns.items()}
+
+        # One alternation for every keyword of every type - a single scan of the text
+        self.keyword_types = {}
+        for doc, spec in patterns.items():
+            for keyword in spec["keywords"]:
+                self.keyword_types.setdefault(keyword, []).append(doc)
+        alternation = "|".join(re.escape(kw) for kw in sorted(self.keyword_types, key=len, reverse=True))
+        self.keyword_re = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+    def keyword_hits(self, text: str) -> Dict[str, set]:
+        hits = {doc: set() for doc in self.patterns}
+        for match in self.keyword_re.finditer(text):
+            keyword = match.group(0).lower()
+            for doc in self.keyword_types.get(keyword, []):
+                hits[doc].add(keyword)
+        return hits
+
+    def number_matches(self, doc: str, text: str) -> List[str]:
+        """Matches of a type's number pattern - the loose certificate patterns run
+        case-insensitively and also match plain long words, so each must contain a digit"""
+        return [match.group(0) for match in self.number_res[doc].finditer(text)
+                if any(ch.isdigit() for ch in match.group(0))]
+
+    def document_number(self, doc: str, text: str) -> tuple:
+        """Best document number for a type and whether it passes the structural check"""
+        if doc == "aadhaar":
+            candidates = [re.sub(r"\s", "", m) for m in self.number_res[doc].findall(text)]
+            for number in candidates:
+                # Aadhaar numbers never start with 0 or 1
+                if number[0] not in "01" and verhoeff_valid(number):
+                    return f"{number[:4]} {number[4:8]} {number[8:]}", True
+            return (candidates[0] if candidates else None), False
+        if doc == "pan":
+            match = PAN_RE.search(text)
+            if match:
+                return match.group(0), True
+        numbers = self.number_matches(doc, text)
+        return (numbers[0] if numbers else None), False
+
+    def extract_fields(self, doc: str, text: str, number: Optional[str]) -> Dict:
+        data = {field: None for field in EXTRACTED_FIELDS}
+        data["document_number"] = number
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+        dob = DOB_RE.search(text) or DATE_RE.search(text)
+        data["dob"] = dob.group(1) if dob else None
+
+        father = FATHER_RE.search(text)
+        data["father_name"] = father.group(1).strip() if father else None
+
+        name = NAME_RE.search(text)
+        if name:
+            data["name"] = name.group(1).strip()
+        elif dob:
+            # Aadhaar/PAN print the holder's name on the line above the DOB
+            # (PAN: above the father's name)
+            dob_line = next((i for i, line in enumerate(lines) if dob.group(1) in line), None)
+            offset = 2 if doc == "pan" and father is None else 1
+            if dob_line is not None and dob_line >= offset and NAME_LINE_RE.match(lines[dob_line - offset]):
+                data["name"] = lines[dob_line - offset]
+
+        if doc == "marksheet":
+            data["roll_number"] = number
+        return data
+
+    def classify(self, text: str) -> Dict:
+        hits = self.keyword_hits(text)
+        best = None
+
+        for doc, spec in self.patterns.items():
+            number, strong = self.document_number(doc, text)
+            # Certificates quote the holder's Aadhaar number too, so a valid number
+            # only identifies the type when no other type's keywords appear
+            strong = strong and not any(found for other, found in hits.items() if other != doc)
+            score = 45 if strong else (10 if number else 0)
+            score += min(30, 15 * len(hits[doc]))
+            if best is None or score > best[1]:
+                best = (doc, score, number, strong)
+
+        doc, score, number, strong = best
+        if score == 0:
+            return self.unknown()
+
+        data = self.extract_fields(doc, text, number)
+        wanted = [FIELD_ALIASES.get(field, field) for field in self.patterns[doc]["fields"]]
+        found = [field for field in wanted if data.get(field)]
+        missing = [field for field in wanted if not data.get(field)]
+
+        confidence = min(100, score + 10 * len(found))
+        return {
+            "document_type": DOC_TYPE_NAMES.get(doc, doc.title()),
+            "extracted_data": data,
+            "confidence": confidence,
+            "is_valid_format": strong or (number is not None and bool(hits[doc])),
+            "quality_issues": [f"Missing {field.replace('_', ' ')}" for field in missing],
+            "text_clarity": "good" if confidence >= 80 else "fair",
+            "completeness": round(100 * len(found) / len(wanted)) if wanted else 0,
+            "source": "rules"
+        }
+
+    def is_hit(self, line: str) -> bool:
+        """Keyword, dated field or document number"""
+        if self.keyword_re.search(line) or DATE_RE.search(line) or NAME_RE.search(line) or FATHER_RE.search(line):
+            return True
+        return any(self.number_matches(doc, line) for doc in self.patterns)
+
+    def compact(self, text: str, token_budget: int) -> tuple:
+        """Shrink OCR text for the LLM prompt: drop noise and duplicate lines, then keep
+        lines with keyword/number hits (and their neighbours) first, within the budget.
+        """
+        lines, seen = [], set()
+        for raw in text.splitlines():
+            line = " ".join(raw.split())
+            key = line.lower()
+            if not line or key in seen or is_low_information(line):
+                continue
+            seen.add(key)
+            lines.append(line)
+
+        # 0 = keyword or document-number hit, 1 = next to a hit, 2 = everything else
+        priority = [2] * len(lines)
+        for i, line in enumerate(lines):
+            if self.is_hit(line):
+                priority[i] = 0
+                for j in (i - 1, i + 1):
+                    if 0 <= j < len(lines) and priority[j] == 2:
+                        priority[j] = 1
+
+        kept, used = set(), 0
+        for level in (0, 1, 2):
+            for i, line in enumerate(lines):
+                cost = estimate_tokens(line) + 1
+                if priority[i] == level and used + cost <= token_budget:
+                    kept.add(i)
+                    used += cost
+
+        compacted = "\n".join(line for i, line in enumerate(lines) if i in kept)
+        original_tokens = estimate_tokens(text)
+        compacted_tokens = estimate_tokens(compacted)
+        return compacted, {
+            "original_tokens": original_tokens,
+            "compacted_tokens": compacted_tokens,
+            "reduction_pct": round(100 * (1 - compacted_tokens / original_tokens), 1) if original_tokens else 0.0,
+            "lines_kept": len(kept),
+            "lines_dropped": len(text.splitlines()) - len(kept)
+        }
+
+    def unknown(self) -> Dict:
+        return {
+            "document_type": "Unknown",
+            "extracted_data": {field: None for field in EXTRACTED_FIELDS},
+            "confidence": 0,
+            "is_valid_format": False,
+            "quality_issues": ["No known document identifiers found"],
+            "text_clarity": "poor",
+            "completeness": 0,
+            "source": "rules"
+        }
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class EngineBusyError(Exception):
+    """Raised when the job queue is full"""
+
+
+class EngineTimeoutError(Exception):
+    """Raised when a job exceeds its time budget"""
+
+
+# Set in each worker process by _init_worker
+_start_queue = None
+
+
+def _init_worker(start_queue, initializer: Optional[Callable]):
+    global _start_queue
+    _start_queue = start_queue
+    if initializer is not None:
+        initializer()
+
+
+def _run_job(job_id: int, fn: Callable, *args) -> Any:
+    """Worker side of a job - report (job id, pid, start time) before running it"""
+    _start_queue.put((job_id, os.getpid(), time.time()))
+    return fn(*args)
+
+
+class _Pool:
+    """One ProcessPoolExecutor and the jobs submitted to it"""
+
+    def __init__(self, executor: ProcessPoolExecutor):
+        self.executor = executor
+        self.futures = {}  # job id -> future, until it finishes
+        self.stuck = set()  # job ids past their timeout
+        self.reaping = False
+
+
+class ExecutionEngine:
+    """Process pool for CPU-bound work with a bounded queue, job timeouts and worker recycling.
+
+    A job's timeout runs from the moment a worker picks it up, not from
+    submission, so time spent queued behind other jobs does not count.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, queue_size: int = 32,
+                 job_timeout: float = 120.0, max_jobs_per_worker: int = 50,
+                 initializer: Optional[Callable] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.initializer = initializer
+        # Jobs running on a worker plus jobs waiting for one
+        self.capacity = self.max_workers + queue_size
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._ids = itertools.count()
+        self._started = {}  # job id -> (worker pid, start time), until it finishes
+        self._waiters = {}  # job id -> (event loop, event) set when the job starts
+        self._context = None
+        self._start_queue = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_pool(self) -> _Pool:
+        with self._lock:
+            if self._pool is None:
+                if self._start_queue is None:
+                    # Recycled workers are spawned (as ProcessPoolExecutor does
+                    # itself with max_tasks_per_child); the queue must match
+                    self._context = multiprocessing.get_context("spawn" if self.max_jobs_per_worker else None)
+                    self._start_queue = self._context.SimpleQueue()
+                    threading.Thread(target=self._listen, args=(self._start_queue,),
+                                     name="engine-starts", daemon=True).start()
+                # Workers exit after max_jobs_per_worker jobs so leaked memory
+                # (OpenCV/Tesseract buffers) is handed back to the OS
+                self._pool = _Pool(ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._context,
+                    max_tasks_per_child=self.max_jobs_per_worker or None,
+                    initializer=_init_worker,
+                    initargs=(self._start_queue, self.initializer)
+                ))
+            return self._pool
+
+    def _listen(self, start_queue):
+        """Record when and where each job starts, and wake its caller"""
+        while True:
+            message = start_queue.get()
+            if message is None:
+                return
+            job_id, pid, started_at = message
+            with self._lock:
+                self._started[job_id] = (pid, started_at)
+                waiter = self._waiters.pop(job_id, None)
+            if waiter is not None:
+                loop, event = waiter
+                loop.call_soon_threadsafe(event.set)
+
+    def _finished(self, pool: _Pool, job_id: int):
+        with self._lock:
+            self._in_flight -= 1
+            pool.futures.pop(job_id, None)
+            self._started.pop(job_id, None)
+            self._waiters.pop(job_id, None)
+
+    def _reset_pool(self, broken: _Pool):
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+            for job_id in broken.futures:
+                self._started.pop(job_id, None)
+                self._waiters.pop(job_id, None)
+            broken.futures.clear()
+        broken.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _overdue(self, job_id: int, now: float) -> bool:
+        started = self._started.get(job_id)
+        return started is not None and now - started[1] > self.job_timeout
+
+    def _retire_pool(self, pool: _Pool, job_id: int):
+        """Route new jobs to a fresh pool and kill the stuck worker once the pool's other jobs finish.
+
+        A timed-out job keeps running (e.g. a hung tesseract call) and keeps its
+        worker and queue slot; killing the worker frees both. Killing it while
+        other jobs still run would break the pool under them, so they finish first.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+            pool.stuck.add(job_id)
+            if pool.reaping:
+                return
+            pool.reaping = True
+        # Stop accepting work; jobs queued on the old pool run if a worker frees up,
+        # and the rest are retried on the fresh pool once it is killed
+        pool.executor.shutdown(wait=False)
+
+        def reap():
+            while True:
+                with self._lock:
+                    now = time.time()
+                    # Only jobs already running; queued ones are retried on the
+                    # fresh pool. Jobs whose callers went away are not timed out
+                    # by anyone else, so overdue ones are not waited for either.
+                    others = [future for other, future in pool.futures.items()
+                              if other in self._started and other not in pool.stuck
+                              and not self._overdue(other, now)]
+                if not others:
+                    break
+                wait_futures(others, timeout=1)
+            with self._lock:
+                pids = [self._started[job][0] for job in pool.futures if job in self._started]
+            for pid in pids:
+                try:
+                    os.kill(pid, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+                except OSError:
+                    pass  # already gone
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+
+        threading.Thread(target=reap, name="engine-reaper", daemon=True).start()
+
+    def _submit(self, fn: Callable, args: tuple) -> tuple:
+        pool = self._get_pool()
+        job_id = next(self._ids)
+        started = asyncio.Event()
+        with self._lock:
+            # Registered before submitting, so the start message cannot be missed
+            self._waiters[job_id] = (asyncio.get_running_loop(), started)
+        try:
+            cf_future = pool.executor.submit(_run_job, job_id, fn, *args)
+        except Exception:
+            self._finished(pool, job_id)
+            raise
+        with self._lock:
+            pool.futures[job_id] = cf_future
+        # The slot is freed when the worker actually finishes (or is killed),
+        # not when the caller gives up
+        cf_future.add_done_callback(lambda _: self._finished(pool, job_id))
+        return pool, job_id, started, asyncio.wrap_future(cf_future)
+
+    async def _wait(self, pool: _Pool, job_id: int, started: asyncio.Event, result: asyncio.Future,
+                    timeout: float) -> Any:
+        # Time spent queued is bounded by the queue size; the clock starts on a worker
+        waiting = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({result, waiting}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiting.cancel()
+        if not result.done():
+            with self._lock:
+                started_at = self._started.get(job_id, (None, time.time()))[1]
+            await asyncio.wait({result}, timeout=max(0.0, timeout - (time.time() - started_at)))
+        if not result.done():
+            self._retire_pool(pool, job_id)
+            raise EngineTimeoutError(f"Job exceeded {timeout}s")
+        return result.result()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on a worker process without blocking the event loop"""
+        timeout = timeout or self.job_timeout
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise EngineBusyError(f"Execution queue full ({self.capacity} jobs)")
+            self._in_flight += 1
+
+        for attempt in range(2):
+            if attempt:
+                with self._lock:
+                    self._in_flight += 1
+            pool, job_id, started, result = self._submit(fn, args)
+            try:
+                return await self._wait(pool, job_id, started, result, timeout)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool for later jobs
+                self._reset_pool(pool)
+                # A job that never started was only queued on the broken (or
+                # retired) pool, so it gets one more try on a fresh one
+                if started.is_set() or attempt:
+                    raise
+            finally:
+                # Cancels a job still queued when the caller gives up
+                result.cancel()
+
+    async def warm(self):
+        """Start the worker processes (running their initializer) before the first real job"""
+        executor = self._get_pool().executor
+        # Overlapping no-op jobs, so each one lands on its own worker
+        futures = [executor.submit(time.sleep, 0.2) for _ in range(self.max_workers)]
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            start_queue, self._start_queue = self._start_queue, None
+            self._started.clear()
+            self._waiters.clear()
+        if pool is not None:
+            pool.executor.shutdown(wait=wait, cancel_futures=True)
+        if start_queue is not None:
+            start_queue.put(None)
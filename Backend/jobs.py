@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+
+FINISHED = ("done", "failed")
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue has no free slot"""
+
+
+class MemoryJobStore:
+    """In-process job records with TTL eviction"""
+
+    def __init__(self, ttl: float = 3600, max_jobs: int = 10000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()  # job_id -> (expires_at, json string)
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict):
+        now = time.time()
+        with self._lock:
+            self._jobs[job["job_id"]] = (now + self.ttl, json.dumps(job))
+            self._jobs.move_to_end(job["job_id"])
+            # Oldest first, so expired and over-limit records come off the front
+            while self._jobs:
+                expires_at, _ = next(iter(self._jobs.values()))
+                if expires_at > now and len(self._jobs) <= self.max_jobs:
+                    break
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return json.loads(entry[1])
+
+
+class SQLiteJobStore:
+    """Job records in SQLite so finished results survive a restart"""
+
+    def __init__(self, db_path: str, ttl: float = 3600):
+        self.ttl = ttl
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, record TEXT NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires_at)")
+        self._db.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+        self._fail_interrupted()
+        self._db.commit()
+
+    def _fail_interrupted(self):
+        # Jobs queued or running when the previous process stopped will never finish
+        rows = self._db.execute("SELECT record FROM jobs WHERE status NOT IN (?, ?)", FINISHED).fetchall()
+        for (record,) in rows:
+            job = json.loads(record)
+            job.update(status="failed", error="Interrupted by a service restart, please resubmit",
+                       status_code=503, finished_at=time.time())
+            self._db.execute("UPDATE jobs SET status = ?, record = ? WHERE job_id = ?",
+                             (job["status"], json.dumps(job), job["job_id"]))
+
+    def save(self, job: Dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, record, expires_at) VALUES (?, ?, ?, ?)",
+                (job["job_id"], job["status"], json.dumps(job), now + self.ttl)
+            )
+            if job["status"] in FINISHED:
+                self._db.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT record FROM jobs WHERE job_id = ? AND expires_at > ?",
+                                   (job_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class JobQueue:
+    """Bounded queue of jobs worked by a fixed number of asyncio workers.
+
+    Store calls are blocking (SQLite commits), so they run off the event loop:
+    writes on one writer thread, which keeps each job's records in order, and
+    reads on the default thread pool.
+    """
+
+    def __init__(self, store_factory: Callable[[], object], workers: int = 4, queue_size: int = 64):
+        self.store_factory = store_factory
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self._store = None
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self._events = {}
+        self._writer = None
+
+    @property
+    def store(self):
+        """Built on first use, not at import - processes that merely import the
+        service (spawned OCR workers) must not open it and sweep interrupted jobs"""
+        if self._store is None:
+            self._store = self.store_factory()
+        return self._store
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Open the store and start the workers (on first submit, or from a warm-up hook)"""
+        # Workers belong to the event loop that serves the app
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Open the store now, in the serving process, so interrupted jobs are swept at startup
+            self.store
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._events = {}
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    def _save(self, job: Dict) -> Awaitable:
+        # Handed to the writer thread straight away (a snapshot, as workers keep
+        # updating the record), so writes land in the order they were made
+        return asyncio.get_running_loop().run_in_executor(self._writer, self.store.save, dict(job))
+
+    async def submit(self, handler: Callable[[], Awaitable[Dict]], **meta) -> Dict:
+        """Queue handler() and return its job record; raises JobQueueFullError when full"""
+        self.start()
+        if self._queue.full():
+            raise JobQueueFullError(f"Job queue full ({self.queue_size} jobs)")
+        job = {"job_id": uuid.uuid4().hex, "status": "queued", "submitted_at": time.time(), **meta}
+        self._queue.put_nowait((job, handler))
+        # Queued before a worker can pick the job up and record it as running
+        await self._save(job)
+        return job
+
+    async def _work(self):
+        while True:
+            job, handler = await self._queue.get()
+            job.update(status="running", started_at=time.time())
+            await self._save(job)
+            try:
+                job["result"] = await handler()
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                # HTTPException carries its own detail and status code
+                job["error"] = getattr(e, "detail", None) or str(e)
+                job["status_code"] = getattr(e, "status_code", 500)
+            job["finished_at"] = time.time()
+            await self._save(job)
+            event = self._events.pop(job["job_id"], None)
+            if event is not None:
+                event.set()
+            self._queue.task_done()
+
+    async def wait(self, job_id: str, timeout: float = 0) -> Optional[Dict]:
+        """Job record, long-polling up to timeout seconds for it to finish"""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] in FINISHED or timeout <= 0:
+            return job
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._writer is not None:
+            # Let records already handed over reach the store
+            await asyncio.to_thread(self._writer.shutdown)
+            self._writer = None
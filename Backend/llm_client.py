@@ -0,0 +1,284 @@
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the LLM call fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMQueueTimeout(LLMError):
+    """Raised when the rate limiter cannot admit a call before its deadline"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to a per-minute quota"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min admission control; callers queue in FIFO order"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    async def acquire(self, tokens: int, deadline: Optional[float] = None):
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        return
+                    if deadline is not None and time.monotonic() + wait > deadline:
+                        raise LLMQueueTimeout("LLM rate limit queue deadline exceeded", 429)
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+    def pause(self, seconds: float):
+        """Server said 429 - drain the request bucket so queued callers back off too"""
+        self.requests.tokens = min(self.requests.tokens, -seconds * self.requests.rate)
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    chars = sum(len(m.get("content", "")) for m in messages)
+    return math.ceil(chars / 4) + max_tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent or unparseable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None  # not an RFC 7231 date - HTTP-dates are always GMT
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class LLMClient:
+    """Shared async client for the Groq (OpenAI-compatible) chat completions API"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = GROQ_BASE_URL,
+                 max_concurrency: int = 8, requests_per_minute: float = 30,
+                 tokens_per_minute: float = 12000, max_retries: int = 4,
+                 timeout: float = 30.0, queue_timeout: float = 30.0):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY", "")
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._loop = None
+        self._http = None
+        self._slots = None
+        self.limiter = None
+        self.stats = {"requests": 0, "retries": 0, "errors": 0, "rate_limited": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _bind(self):
+        # httpx/asyncio primitives belong to one event loop - rebuild if it changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency,
+                                    keepalive_expiry=60.0)
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self.limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+
+    async def _post(self, payload: Dict, deadline: float, stream: bool = False) -> httpx.Response:
+        """POST with jittered exponential backoff on 429/5xx and connection errors.
+        With stream=True the body is left unread for the caller (who must close it)."""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._slots:
+                    request = self._http.build_request("POST", "/chat/completions", json=payload)
+                    response = await self._http.send(request, stream=stream)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                await response.aclose()
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    # None (missing or unparseable) falls back to the normal backoff
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    self.limiter.pause(retry_after or 0)
+                error = LLMError(f"LLM API returned {response.status_code}", response.status_code)
+            except httpx.TransportError as e:
+                error = LLMError(f"LLM API connection failed: {e}")
+
+            if attempt == self.max_retries:
+                raise error
+            # Full jitter, but never sooner than the server asked for
+            delay = max(retry_after or 0, random.uniform(0, min(20.0, 0.5 * 2 ** attempt)))
+            if time.monotonic() + delay > deadline:
+                raise error
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def chat(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                   temperature: float = 0.1, max_tokens: int = 1500,
+                   deadline: Optional[float] = None) -> Dict:
+        """Chat completion; waits in the limiter queue until `deadline` (monotonic seconds)"""
+        self._bind()
+        deadline = deadline or time.monotonic() + self.queue_timeout + self.timeout
+        estimated = estimate_tokens(messages, max_tokens)
+        await self.limiter.acquire(estimated, deadline)
+
+        payload = {"model": model, "messages": messages,
+                   "temperature": temperature, "max_tokens": max_tokens}
+        self.stats["requests"] += 1
+        try:
+            response = await self._post(payload, deadline)
+            response.raise_for_status()
+        except (LLMError, httpx.HTTPStatusError) as e:
+            self.stats["errors"] += 1
+            raise e if isinstance(e, LLMError) else LLMError(str(e), e.response.status_code)
+
+        result = response.json()
+        self._record_usage(result.get("usage") or {}, estimated)
+        return result
+
+    def _record_usage(self, usage: Dict, estimated: int):
+        self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+        if usage.get("total_tokens"):
+            # Give back what the estimate over-reserved
+            self.limiter.tokens.refund(max(0, estimated - usage["total_tokens"]))
+
+    async def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                     temperature: float = 0.1, max_tokens: int = 1500,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """Chat completion as content deltas, read from the API's server-sent events.
+        Retries only happen before the first delta; closing the iterator closes the connection."""
+        self._bind()
+        deadline = deadline or time.monotonic() + self.queue_timeout + self.timeout
+        estimated = estimate_tokens(messages, max_tokens)
+        await self.limiter.acquire(estimated, deadline)
+
+        payload = {"model": model, "messages": messages, "temperature": temperature,
+                   "max_tokens": max_tokens, "stream": True}
+        self.stats["requests"] += 1
+        try:
+            response = await self._post(payload, deadline, stream=True)
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+        except (LLMError, httpx.HTTPStatusError) as e:
+            self.stats["errors"] += 1
+            raise e if isinstance(e, LLMError) else LLMError(str(e), e.response.status_code)
+
+        usage = {}
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # Groq reports usage on the last chunk under x_groq, OpenAI under usage
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                for choice in chunk.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+        except httpx.TransportError as e:
+            self.stats["errors"] += 1
+            raise LLMError(f"LLM stream interrupted: {e}")
+        finally:
+            await response.aclose()
+            self._record_usage(usage, estimated)
+
+    async def complete(self, messages: List[Dict], **kwargs) -> str:
+        """Chat completion, returning just the assistant message text"""
+        result = await self.chat(messages, **kwargs)
+        return result["choices"][0]["message"]["content"]
+
+    async def warm(self):
+        """Build the HTTP client and limiter on the serving event loop ahead of the first call"""
+        self._bind()
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._loop = None
+
+
+_client = None
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client configured from the environment"""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30")),
+            tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "12000")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+        )
+    return _client
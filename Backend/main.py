@@ -1,25 +1,44 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import pytesseract
-import cv2
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import numpy as np
-from PIL import Image
-import io
 import os
-from typing import Dict, List
-from pdf2image import convert_from_bytes
-from groq import Groq
+import math
+from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import json
 import re
+import asyncio
+import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
+from engine import ExecutionEngine, EngineBusyError, EngineTimeoutError
+from cache import ResultCache
+from analysis import HALO_THRESHOLD, PageAnalysis, release_buffers
+from copymove import find_copy_move
+from ocr_backends import configure_tesseract, create_backend
+from doc_rules import DocumentClassifier, estimate_tokens, normalize_text
+from llm_client import DEFAULT_MODEL, get_llm_client, LLMQueueTimeout
+from jobs import JobQueue, JobQueueFullError, MemoryJobStore, SQLiteJobStore
+from uploads import BodySizeLimitMiddleware, SpooledUpload, spool_upload, too_large
+import metrics
+from metrics import timed
+from dedupe import DuplicateIndex, page_fingerprint
+from startup import WarmUp, lazy_import, preload
 
-# Configure Tesseract
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-os.environ['TESSDATA_PREFIX'] = r'C:\Program Files\Tesseract-OCR\tessdata'
+# OpenCV, PIL and pdf2image load on first use (or during warm-up) - see LAZY_IMPORTS
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
+pdf2image = lazy_import("pdf2image")
 
 load_dotenv()
+
+# Configure Tesseract (TESSERACT_CMD, then PATH, then the default Windows install).
+# A tesseract CLI call running longer than OCR_CALL_TIMEOUT seconds is killed.
+configure_tesseract()
+ocr_backend = create_backend(os.getenv("OCR_BACKEND", "auto"),
+                             timeout=float(os.getenv("OCR_CALL_TIMEOUT", "60")))
 app = FastAPI(title="Scholarship Document Verification")
 
 app.add_middleware(
@@ -30,7 +49,141 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Uploads are streamed to disk (UPLOAD_SPOOL_DIR, default the system temp dir)
+# and never held in memory whole; oversized files or requests get a 413
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_MB", "25")) * 1024 * 1024
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "100")) * 1024 * 1024
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=UPLOAD_MAX_REQUEST_BYTES)
+
+llm_client = get_llm_client()
+
+# PDF rendering: pages are rendered a window at a time, at a DPI that keeps
+# the window inside the memory budget
+PDF_MAX_DPI = int(os.getenv("PDF_MAX_DPI", "300"))
+PDF_MIN_DPI = int(os.getenv("PDF_MIN_DPI", "150"))
+PDF_PAGE_WINDOW = int(os.getenv("PDF_PAGE_WINDOW", "1"))
+PDF_MEMORY_BUDGET_MB = int(os.getenv("PDF_MEMORY_BUDGET_MB", "512"))
+PDF_GRAYSCALE = os.getenv("PDF_GRAYSCALE", "false").lower() == "true"
+
+# Copy-move detection: sorted block signatures, computed on a copy reduced to
+# COPY_MOVE_SIDE px, propose up to COPY_MOVE_CANDIDATES offsets between
+# near-identical content (any offset, not just a grid), and each is verified
+# pixel by pixel in COPY_MOVE_CELL px cells. A page is flagged when the
+# duplicated area exceeds COPY_MOVE_MIN_TEXT_AREA squares of the page's text
+# height, so the threshold holds at any scan resolution. Printed labels that
+# repeat word for word stay below the default.
+COPY_MOVE_CELL = int(os.getenv("COPY_MOVE_CELL", "8"))
+COPY_MOVE_SIDE = int(os.getenv("COPY_MOVE_SIDE", "1280"))
+COPY_MOVE_CANDIDATES = int(os.getenv("COPY_MOVE_CANDIDATES", "5"))
+COPY_MOVE_MIN_SHIFT = int(os.getenv("COPY_MOVE_MIN_SHIFT", "64"))
+COPY_MOVE_MIN_TEXT_AREA = float(os.getenv("COPY_MOVE_MIN_TEXT_AREA", "16"))
+
+# Tampering analysis: "full" runs every check at full resolution; "tiered"
+# runs the ELA/edge/noise checks on a downscaled copy (copy-move always runs on
+# the full-resolution page) and keeps that verdict when it scores at least
+# TAMPERING_CLEAN_SCORE - anything lower gets the full-resolution checks. The
+# default lets through the smooth-page issue and one noise warning, which the
+# calibrated preview reads like the full page, but not an ELA issue (a preview
+# reads ELA high) or a copy-move hit
+TAMPERING_MODE = os.getenv("TAMPERING_MODE", "full").lower()
+TAMPERING_PREVIEW_SIDE = int(os.getenv("TAMPERING_PREVIEW_SIDE", "1024"))
+TAMPERING_CLEAN_SCORE = float(os.getenv("TAMPERING_CLEAN_SCORE", "80"))
+
+# Preview metrics are brought back to full-resolution terms before the usual
+# thresholds apply: edge density and Laplacian variance are divided by
+# downscale ** exponent (fitted on bench.generate pages, see bench/tiered_check.py)
+PREVIEW_EDGE_EXPONENT = 0.9
+PREVIEW_NOISE_EXPONENT = 0.2
+
+# Tiled processing: denoising, thresholding and the ELA/noise/edge metrics run
+# on overlapping TILE_SIZE tiles in parallel instead of on the whole page.
+# "auto" tiles only pages whose whole-image temporaries would exceed
+# TILE_MEMORY_MB; tile threads are capped so their working set fits it too.
+TILED_PROCESSING = os.getenv("TILED_PROCESSING", "auto").lower()
+TILE_SIZE = max(16, int(os.getenv("TILE_SIZE", "1024")) // 16 * 16)
+TILE_MEMORY_MB = int(os.getenv("TILE_MEMORY_MB", "256"))
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "0")) or os.cpu_count() or 1
+
+# OCR cascade: try each (preprocessing variant, --psm) step in order and stop
+# once the mean Tesseract word confidence reaches OCR_MIN_CONFIDENCE, so clean
+# scans never pay for fastNlMeansDenoising
+OCR_CASCADE = os.getenv("OCR_CASCADE", "true").lower() == "true"
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "75"))
+OCR_CASCADE_STEPS = [
+    (step.split(":")[0], int(step.split(":")[1]))
+    for step in os.getenv("OCR_CASCADE_STEPS", "fast:6,denoised:6,otsu:6,denoised:4").split(",")
+]
+
+# Pages of one document analyzed concurrently (threads inside the OCR worker)
+OCR_PAGE_PARALLELISM = int(os.getenv("OCR_PAGE_PARALLELISM", "2"))
+
+# Cached verdicts are keyed on this - bump it whenever OCR, tampering or
+# prompt logic changes so stale verdicts are not served (settings changes are
+# covered by VERDICT_SETTINGS)
+PIPELINE_VERSION = "3.5"
+
+verify_cache = ResultCache(
+    max_entries=int(os.getenv("VERIFY_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("VERIFY_CACHE_TTL", "86400")),
+    db_path=os.getenv("VERIFY_CACHE_DB") or None,
+    max_db_bytes=int(os.getenv("VERIFY_CACHE_DB_MAX_MB", "256")) * 1024 * 1024
+)
+
+# Local rule-based classification is trusted (and Groq skipped) at or above this
+RULES_MIN_CONFIDENCE = float(os.getenv("RULES_MIN_CONFIDENCE", "85"))
+
+# Approximate token budget for the OCR text pasted into the Groq prompt
+LLM_TEXT_TOKEN_BUDGET = int(os.getenv("LLM_TEXT_TOKEN_BUDGET", "800"))
+
+# Job API (/jobs/verify): JOB_WORKERS documents in flight, JOB_QUEUE_SIZE waiting.
+# Records expire after JOB_TTL seconds; set JOB_STORE_DB to keep them in SQLite.
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))
+JOB_STORE_DB = os.getenv("JOB_STORE_DB")
+
+def job_store():
+    """Opened by the serving process on first use - a SQLite store marks the
+    jobs a previous process left unfinished as failed when it opens"""
+    if JOB_STORE_DB:
+        return SQLiteJobStore(JOB_STORE_DB, ttl=JOB_TTL)
+    return MemoryJobStore(ttl=JOB_TTL)
+
+job_queue = JobQueue(
+    job_store,
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    queue_size=int(os.getenv("JOB_QUEUE_SIZE", "64"))
+)
+
+# Duplicate detection: every verified document's page hashes, ID numbers and
+# holder name are indexed (DUPLICATE_INDEX_DB, in memory by default) and /verify
+# reports earlier uploads by other applicants with the same number, or with a
+# near-identical page and the same holder name
+DUPLICATE_CHECK = os.getenv("DUPLICATE_CHECK", "true").lower() == "true"
+DUPLICATE_INDEX_DB = os.getenv("DUPLICATE_INDEX_DB", ":memory:")
+DUPLICATE_MAX_DISTANCE = int(os.getenv("DUPLICATE_MAX_DISTANCE", "6"))
+
+# Groq verdicts memoised on the normalised prompt text, so a re-scan or re-encode
+# of a document already seen skips the call. Bump LLM_PROMPT_VERSION whenever
+# the validation prompt or model changes.
+LLM_PROMPT_VERSION = "1"
+llm_memo = ResultCache(
+    max_entries=int(os.getenv("LLM_MEMO_SIZE", "2048")),
+    ttl=float(os.getenv("LLM_MEMO_TTL", "604800")),
+    db_path=os.getenv("LLM_MEMO_DB") or None,
+    max_db_bytes=int(os.getenv("LLM_MEMO_DB_MAX_MB", "64")) * 1024 * 1024
+)
+
+# Per-stage concurrency for /verify-batch
+BATCH_OCR_CONCURRENCY = int(os.getenv("BATCH_OCR_CONCURRENCY", "4"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+
+# /verify-batch packs several documents into one Groq call, up to
+# BATCH_LLM_TOKEN_BUDGET tokens of document text and BATCH_LLM_MAX_DOCS documents
+BATCH_LLM_PACKING = os.getenv("BATCH_LLM_PACKING", "true").lower() == "true"
+BATCH_LLM_TOKEN_BUDGET = int(os.getenv("BATCH_LLM_TOKEN_BUDGET", "4000"))
+BATCH_LLM_MAX_DOCS = int(os.getenv("BATCH_LLM_MAX_DOCS", "6"))
+BATCH_LLM_LINGER = float(os.getenv("BATCH_LLM_LINGER", "2.0"))
 
 # Document validation patterns
 DOC_PATTERNS = {
@@ -61,32 +214,82 @@ DOC_PATTERNS = {
     }
 }
 
-def preprocess_image(image: np.ndarray) -> np.ndarray:
+def analysis_bytes_per_pixel(image: np.ndarray) -> int:
+    """Peak temporaries per pixel of the whole-image path (int16 Laplacian + ELA decode and diff + Canny)"""
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    return 2 + 2 * channels + 2
+
+_tile_pool = None
+
+def tile_pool() -> ThreadPoolExecutor:
+    """Per-process tile threads, sized so TILE_WORKERS tiles in flight stay under TILE_MEMORY_MB"""
+    global _tile_pool
+    if _tile_pool is None:
+        tile_bytes = (TILE_SIZE + 32) ** 2 * analysis_bytes_per_pixel(np.empty((1, 1, 3), np.uint8))
+        workers = max(1, min(TILE_WORKERS, TILE_MEMORY_MB * 1024 * 1024 // tile_bytes))
+        _tile_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+    return _tile_pool
+
+def page_analysis(image: np.ndarray, scratch: str = "page") -> PageAnalysis:
+    """PageAnalysis for a page, tiled when TILED_PROCESSING calls for it"""
+    if TILED_PROCESSING == "on":
+        tiled = True
+    elif TILED_PROCESSING == "auto":
+        footprint = image.shape[0] * image.shape[1] * analysis_bytes_per_pixel(image)
+        tiled = footprint > TILE_MEMORY_MB * 1024 * 1024
+    else:
+        tiled = False
+    if not tiled:
+        return PageAnalysis(image, scratch)
+    return PageAnalysis(image, scratch, tile=TILE_SIZE, pool=tile_pool() if TILE_WORKERS > 1 else None)
+
+def preprocess_image(image: np.ndarray, analysis: PageAnalysis = None,
+                     variant: str = "denoised") -> np.ndarray:
     """Optimize image for OCR"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    analysis = analysis or page_analysis(image)
     
-    # Apply denoising with moderate strength
-    denoised = cv2.fastNlMeansDenoising(gray, h=10)
+    if variant == "fast":
+        # Cheap first pass - skip the denoiser and rely on adaptive thresholding
+        source = analysis.gray
+    else:
+        # Apply denoising with moderate strength
+        source = analysis.denoised(h=10)
+    
+    if variant == "otsu":
+        _, thresh = cv2.threshold(source, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return thresh
     
     # Use adaptive thresholding for better text extraction
-    thresh = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                   cv2.THRESH_BINARY, 11, 2)
+    thresh = analysis.map_tiles(
+        lambda src: cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2),
+        source, HALO_THRESHOLD
+    )
     return thresh
 
-def detect_tampering(image: np.ndarray) -> Dict:
-    """Improved tampering detection - more realistic for scanned documents"""
+def find_page_copy_move(gray: np.ndarray) -> Dict:
+    """find_copy_move with the configured settings, on a full-resolution page"""
+    return find_copy_move(gray, cell=COPY_MOVE_CELL, side=COPY_MOVE_SIDE,
+                          min_shift=COPY_MOVE_MIN_SHIFT, candidates=COPY_MOVE_CANDIDATES)
+
+def detect_tampering(image: np.ndarray, analysis: PageAnalysis = None, tier: str = None,
+                     scale: float = 1.0, duplicates: Dict = None) -> Dict:
+    """Improved tampering detection - more realistic for scanned documents.
+    scale is how many times the original page was downscaled (preview tier);
+    duplicates is a find_page_copy_move result already computed on the full page."""
+    tier = tier or ("tiered" if TAMPERING_MODE == "tiered" else "full")
+    if tier == "tiered":
+        return detect_tampering_tiered(image, analysis)
+    
     score = 100.0
     issues = []
     warnings = []
     
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    height, width = gray.shape
+    analysis = analysis or page_analysis(image)
+    gray = analysis.gray
     
     # 1. Compression artifacts analysis (ELA) - Adjusted thresholds
-    _, jpg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
-    recompressed = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
-    diff = cv2.absdiff(image, recompressed)
-    ela_score = np.mean(diff)
+    # (not rescaled - a preview always reads higher, which only escalates more)
+    ela_score = analysis.ela_score(quality=90)
     
     # More lenient thresholds - scanned docs have compression
     if ela_score > 35:  # Raised from 25
@@ -97,8 +300,9 @@ def detect_tampering(image: np.ndarray) -> Dict:
         score -= 10
     
     # 2. Edge consistency analysis - More realistic
-    edges = cv2.Canny(gray, 50, 150)
-    edge_density = np.sum(edges > 0) / edges.size
+    # Edges are thin lines, so their share of a downscaled page grows almost
+    # linearly with the downscale
+    edge_density = analysis.edge_density / scale ** PREVIEW_EDGE_EXPONENT
     
     # Adjusted thresholds for real documents
     if edge_density > 0.5:  # Raised from 0.4
@@ -109,7 +313,7 @@ def detect_tampering(image: np.ndarray) -> Dict:
         score -= 15
     
     # 3. Noise variance - Scanned documents have natural noise
-    noise = cv2.Laplacian(gray, cv2.CV_64F).var()
+    noise = analysis.laplacian_var / scale ** PREVIEW_NOISE_EXPONENT
     if noise < 15:  # Lowered from 30
         warnings.append("Low noise - high quality scan or digital")
         score -= 5
@@ -119,29 +323,18 @@ def detect_tampering(image: np.ndarray) -> Dict:
     
     # 4. Color channel consistency - More lenient
     if len(image.shape) == 3:
-        b, g, r = cv2.split(image)
-        b_std = np.std(b)
-        g_std = np.std(g)
-        r_std = np.std(r)
+        b_std, g_std, r_std = analysis.channel_std[:3]
         
         if b_std < 3 or g_std < 3 or r_std < 3:  # Lowered from 5
             warnings.append("Limited color variation")
             score -= 10
     
-    # 5. Duplicate region detection - Less aggressive
-    block_size = 32
-    blocks_seen = {}
-    duplicates = 0
-    
-    for i in range(0, height - block_size, block_size * 2):  # Skip more blocks
-        for j in range(0, width - block_size, block_size * 2):
-            block = gray[i:i+block_size, j:j+block_size]
-            block_hash = hash(block.tobytes())
-            if block_hash in blocks_seen:
-                duplicates += 1
-            blocks_seen[block_hash] = True
+    # 5. Duplicate region (copy-move) detection - sorted block signatures, verified
+    # pixel by pixel (a preview cannot run it - copies only match at full resolution)
+    if duplicates is None:
+        duplicates = find_page_copy_move(gray) if tier == "full" else {"matched_area": 0, "text_area": 0.0}
     
-    if duplicates > 10:  # Raised from 5
+    if duplicates["text_area"] > COPY_MOVE_MIN_TEXT_AREA:
         issues.append("Repeated patterns found")
         score -= 10
     
@@ -153,56 +346,281 @@ def detect_tampering(image: np.ndarray) -> Dict:
         "metrics": {
             "ela_score": round(float(ela_score), 2),
             "edge_density": round(float(edge_density), 3),
-            "noise_variance": round(float(noise), 2)
+            "noise_variance": round(float(noise), 2),
+            "copy_move_area": duplicates["matched_area"]
+        },
+        "tier": tier
+    }
+
+def tampering_preview(image: np.ndarray) -> tuple:
+    """(pyrDown copy no larger than TAMPERING_PREVIEW_SIDE, downscale factor)"""
+    preview = image
+    while max(preview.shape[:2]) > TAMPERING_PREVIEW_SIDE:
+        preview = cv2.pyrDown(preview)
+    return preview, max(image.shape[:2]) / max(preview.shape[:2])
+
+def detect_tampering_tiered(image: np.ndarray, analysis: PageAnalysis = None) -> Dict:
+    """Screen a downscaled copy first; run the full-resolution checks unless it is clearly clean"""
+    if max(image.shape[:2]) <= TAMPERING_PREVIEW_SIDE:
+        return detect_tampering(image, analysis, tier="full")
+    
+    analysis = analysis or page_analysis(image)
+    # Copy-move is cheap next to full-resolution ELA, so both tiers share one run
+    duplicates = find_page_copy_move(analysis.gray)
+    preview, scale = tampering_preview(image)
+    result = detect_tampering(preview, page_analysis(preview, scratch="preview"), tier="preview",
+                              scale=scale, duplicates=duplicates)
+    if result["authenticity_score"] >= TAMPERING_CLEAN_SCORE:
+        return result
+    
+    # An ELA issue, a copy-move hit or a middling score - the full-resolution checks decide
+    return detect_tampering(image, analysis, tier="full", duplicates=duplicates)
+
+def pdf_page_sizes(pdf_path: str) -> List[tuple]:
+    """Page sizes in points (width, height) as reported by pdfinfo"""
+    page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+    info = pdf2image.pdfinfo_from_path(pdf_path, first_page=1, last_page=page_count)
+    
+    sizes = []
+    for page in range(1, page_count + 1):
+        size = info.get(f"Page {page:4d} size") or info.get("Page size", "")
+        match = re.match(r"([\d.]+) x ([\d.]+)", size)
+        # Fall back to A4 if pdfinfo gives us nothing usable
+        sizes.append((float(match.group(1)), float(match.group(2))) if match else (595.0, 842.0))
+    return sizes
+
+def choose_pdf_dpi(width_pts: float, height_pts: float, budget_bytes: float) -> int:
+    """Highest DPI (up to PDF_MAX_DPI) whose working set fits the per-page budget"""
+    # Rough peak bytes per pixel across render, BGR copy, ELA, denoise and the
+    # int16 Laplacian; grayscale rendering drops the three-channel copies
+    bytes_per_pixel = 8 if PDF_GRAYSCALE else 22
+    area_sq_in = (width_pts / 72) * (height_pts / 72)
+    dpi = int(math.sqrt(budget_bytes / (bytes_per_pixel * area_sq_in)))
+    return max(PDF_MIN_DPI, min(PDF_MAX_DPI, dpi))
+
+def iter_pdf_pages(pdf_path: str):
+    """Render a PDF one window of pages at a time instead of all pages up front"""
+    sizes = pdf_page_sizes(pdf_path)
+    window = max(1, PDF_PAGE_WINDOW)
+    # One rendered window plus the pages still being analyzed share the budget
+    pages_in_memory = window + max(1, OCR_PAGE_PARALLELISM) - 1
+    page_budget = PDF_MEMORY_BUDGET_MB * 1024 * 1024 / pages_in_memory
+    
+    for first in range(1, len(sizes) + 1, window):
+        last = min(first + window - 1, len(sizes))
+        largest = max(sizes[first - 1:last], key=lambda s: s[0] * s[1])
+        with timed("pdf_render"):
+            images = pdf2image.convert_from_path(pdf_path, dpi=choose_pdf_dpi(*largest, page_budget),
+                                       first_page=first, last_page=last, grayscale=PDF_GRAYSCALE)
+        while images:
+            img = images.pop(0)
+            img_array = np.array(img)
+            img.close()
+            if img_array.ndim == 3:
+                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+            yield img_array
+
+def combine_tampering_results(tampering_results: List[Dict]) -> Dict:
+    """Average per-page tampering results into one document verdict"""
+    avg_score = np.mean([r["authenticity_score"] for r in tampering_results])
+    all_issues = [issue for r in tampering_results for issue in r["issues"]]
+    all_warnings = [w for r in tampering_results for w in r.get("warnings", [])]
+    tiers = {r.get("tier", "full") for r in tampering_results}
+    
+    return {
+        "authenticity_score": round(avg_score, 1),
+        "tampering_detected": len(all_issues) > 0,
+        "issues": list(set(all_issues)),
+        "warnings": list(set(all_warnings)),
+        "tier": tiers.pop() if len(tiers) == 1 else "mixed",
+        "fingerprints": [fp for r in tampering_results for fp in r.get("fingerprints", [])],
+        "metrics": {
+            key: round(float(np.mean([r["metrics"][key] for r in tampering_results])), 3)
+            for key in tampering_results[0]["metrics"]
         }
     }
 
-def extract_text_from_file(file_bytes: bytes, filename: str) -> tuple:
-    """Extract text from image/PDF with quality assessment"""
+def ocr_page(img_array: np.ndarray, analysis: PageAnalysis) -> tuple:
+    """Progressive OCR - escalate to costlier preprocessing only while Tesseract is unsure"""
+    if not OCR_CASCADE:
+        with timed("preprocess"):
+            processed = preprocess_image(img_array, analysis)
+        with timed("ocr"):
+            return ocr_backend.image_to_string(processed, psm=6), None
+    
+    best_text, best_confidence = "", -1.0
+    for variant, psm in OCR_CASCADE_STEPS:
+        with timed("preprocess"):
+            processed = preprocess_image(img_array, analysis, variant)
+        with timed("ocr"):
+            text, confidence = ocr_backend.recognize(processed, psm=psm)
+        if confidence > best_confidence:
+            best_text, best_confidence = text, confidence
+        if confidence >= OCR_MIN_CONFIDENCE:
+            break
+    return best_text, best_confidence
+
+def analyze_page(img_array: np.ndarray) -> tuple:
+    """Tampering check and OCR for a single page"""
+    analysis = page_analysis(img_array)
+    with timed("tampering"):
+        tampering = detect_tampering(img_array, analysis)
+    if DUPLICATE_CHECK:
+        with timed("fingerprint"):
+            tampering["fingerprints"] = [page_fingerprint(analysis.gray)]
+    text, confidence = ocr_page(img_array, analysis)
+    if confidence is not None:
+        tampering["metrics"]["ocr_confidence"] = round(confidence, 1)
+    return text, tampering
+
+_page_pool = None
+
+def page_pool() -> ThreadPoolExecutor:
+    """Per-process page threads - kept alive so their OCR handles are reused across documents"""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ThreadPoolExecutor(max_workers=OCR_PAGE_PARALLELISM, initializer=ocr_backend.warm)
+    return _page_pool
+
+def warm_ocr_worker():
+    """Process-pool initializer - load the OCR engine before the first job arrives"""
+    preload(cv2, Image, pdf2image)
+    ocr_backend.warm()
+    if OCR_PAGE_PARALLELISM > 1:
+        page_pool()
+
+def analyze_pages(pages) -> List[tuple]:
+    """Analyze pages concurrently, keeping at most OCR_PAGE_PARALLELISM in flight"""
+    if OCR_PAGE_PARALLELISM <= 1:
+        return [analyze_page(page) for page in pages]
+    
+    pool = page_pool()
+    results = []
+    # FIFO of futures - collecting from the front keeps page order and
+    # stops the renderer from running ahead of the workers
+    pending = deque()
+    for page in pages:
+        if len(pending) >= OCR_PAGE_PARALLELISM:
+            results.append(pending.popleft().result())
+        pending.append(pool.submit(analyze_page, page))
+        del page
+    results.extend(future.result() for future in pending)
+    return results
+
+def load_image(path: str) -> np.ndarray:
+    """Decode an image file to BGR straight from a memory-mapped view of it"""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    # EXIF orientation is ignored, as it was with PIL
+    img_bgr = cv2.imdecode(data, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    del data
+    if img_bgr is not None:
+        return img_bgr
+    
+    # Formats OpenCV cannot decode (e.g. GIF) go through PIL
+    with Image.open(path) as image:
+        img_array = np.array(image)
+    
+    if len(img_array.shape) == 2:
+        return cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
+    elif img_array.shape[2] == 4:
+        return cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+
+def extract_text_from_file(path: str, filename: str) -> tuple:
+    """Extract text from an image/PDF file on disk with quality assessment"""
     try:
         if filename.lower().endswith('.pdf'):
-            images = convert_from_bytes(file_bytes, dpi=300)
-            all_text = []
-            tampering_results = []
+            # poppler reads the spooled upload directly
+            page_results = analyze_pages(iter_pdf_pages(path))
             
-            for img in images:
-                img_array = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                tampering_results.append(detect_tampering(img_array))
-                processed = preprocess_image(img_array)
-                text = pytesseract.image_to_string(processed, lang='eng', config='--psm 6')
-                all_text.append(text)
+            if not page_results:
+                raise ValueError("PDF has no pages")
             
+            all_text = [text for text, _ in page_results]
+            tampering_results = [tampering for _, tampering in page_results]
             combined_text = "\n".join(all_text).strip()
-            avg_score = np.mean([r["authenticity_score"] for r in tampering_results])
-            all_issues = [issue for r in tampering_results for issue in r["issues"]]
-            all_warnings = [w for r in tampering_results for w in r.get("warnings", [])]
-            
-            return combined_text, {
-                "authenticity_score": round(avg_score, 1),
-                "tampering_detected": len(all_issues) > 0,
-                "issues": list(set(all_issues)),
-                "warnings": list(set(all_warnings))
-            }
+            return combined_text, combine_tampering_results(tampering_results)
         else:
-            image = Image.open(io.BytesIO(file_bytes))
-            img_array = np.array(image)
-            
-            if len(img_array.shape) == 2:
-                img_bgr = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
-            elif img_array.shape[2] == 4:
-                img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
-            else:
-                img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            
-            tampering_result = detect_tampering(img_bgr)
-            processed = preprocess_image(img_bgr)
-            text = pytesseract.image_to_string(processed, lang='eng', config='--psm 6')
+            with timed("decode"):
+                img_bgr = load_image(path)
+            text, tampering_result = analyze_page(img_bgr)
             
             return text.strip(), tampering_result
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to extract text: {str(e)}")
 
+# Process pool for OCR + tampering analysis (keeps the event loop free)
+ocr_engine = ExecutionEngine(
+    max_workers=int(os.getenv("OCR_WORKERS", "0")) or None,
+    queue_size=int(os.getenv("OCR_QUEUE_SIZE", "32")),
+    job_timeout=float(os.getenv("OCR_JOB_TIMEOUT", "120")),
+    max_jobs_per_worker=int(os.getenv("OCR_MAX_JOBS_PER_WORKER", "50")),
+    initializer=warm_ocr_worker
+)
+
+def ocr_job(path: str, filename: str) -> tuple:
+    """Worker-process entry point - HTTPException cannot be pickled back to the parent.
+    Stage timings travel back with the result."""
+    metrics.start_worker_collection()
+    try:
+        text, tampering = extract_text_from_file(path, filename)
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+    finally:
+        # Page-sized scratch buffers are reused across the pages of a job, not
+        # held by idle workers between jobs
+        release_buffers()
+    return text, tampering, metrics.drain_worker_times()
+
+async def run_ocr(path: str, filename: str) -> tuple:
+    """Run OCR and tampering analysis on the process pool (only the path crosses the process boundary)"""
+    try:
+        with timed("ocr_job"):
+            text, tampering, stage_times = await ocr_engine.run(ocr_job, path, filename)
+        for stage, seconds in stage_times:
+            metrics.record(stage, seconds)
+        return text, tampering
+    except EngineBusyError:
+        raise HTTPException(status_code=503, detail="OCR queue is full, please retry shortly",
+                            headers={"Retry-After": "5"})
+    except EngineTimeoutError:
+        raise HTTPException(status_code=504, detail="Document processing timed out")
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Settings that change a verdict, or the pixels and text it is computed from,
+# go into every cache key, so a persistent cache never answers with a verdict
+# computed under different settings
+VERDICT_SETTINGS = {
+    "pdf_render": [PDF_MAX_DPI, PDF_MIN_DPI, PDF_MEMORY_BUDGET_MB, PDF_GRAYSCALE, PDF_PAGE_WINDOW],
+    "ocr_backend": ocr_backend.name,
+    "ocr_cascade": OCR_CASCADE,
+    "ocr_cascade_steps": OCR_CASCADE_STEPS,
+    "ocr_min_confidence": OCR_MIN_CONFIDENCE,
+    "tiled_processing": TILED_PROCESSING,
+    "tile_size": TILE_SIZE,
+    "tile_memory_mb": TILE_MEMORY_MB,
+    "tampering_mode": TAMPERING_MODE,
+    "tampering_preview_side": TAMPERING_PREVIEW_SIDE,
+    "tampering_clean_score": TAMPERING_CLEAN_SCORE,
+    "preview_exponents": [PREVIEW_EDGE_EXPONENT, PREVIEW_NOISE_EXPONENT],
+    "copy_move": [COPY_MOVE_CELL, COPY_MOVE_SIDE, COPY_MOVE_CANDIDATES, COPY_MOVE_MIN_SHIFT,
+                  COPY_MOVE_MIN_TEXT_AREA],
+    "rules_min_confidence": RULES_MIN_CONFIDENCE,
+    "llm_text_token_budget": LLM_TEXT_TOKEN_BUDGET,
+    "llm_model": DEFAULT_MODEL,
+    "llm_prompt_version": LLM_PROMPT_VERSION,
+    # A packed /verify-batch prompt is not the single-document prompt
+    "batch_llm_packing": BATCH_LLM_PACKING
+}
+SETTINGS_DIGEST = hashlib.sha256(json.dumps(VERDICT_SETTINGS, sort_keys=True).encode()).hexdigest()[:12]
+
+def verify_cache_key(kind: str, upload: SpooledUpload) -> str:
+    """Content-addressed key - the extension matters because it picks the PDF or image path"""
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    return f"{kind}:{PIPELINE_VERSION}:{SETTINGS_DIGEST}:{extension}:{upload.sha256}"
+
 def validate_document_pattern(text: str, doc_type: str) -> Dict:
     """Check document format and patterns"""
     validation = {
@@ -229,18 +647,13 @@ def validate_document_pattern(text: str, doc_type: str) -> Dict:
     
     return validation
 
-def ai_validate_document(text: str) -> Dict:
-    """AI-powered document validation with balanced criteria"""
-    try:
-        prompt = f"""Analyze this document and extract information. Return ONLY valid JSON.
+document_classifier = DocumentClassifier(DOC_PATTERNS)
 
-Document Text:
-{text}
+VALIDATION_SYSTEM_PROMPT = "You are a document validator. Extract data accurately and give realistic confidence scores. Real scanned documents with minor imperfections should score 70-85."
 
-Return JSON with this exact structure:
-{{
+VALIDATION_SCHEMA = """{
   "document_type": "Exact type (Aadhaar Card/PAN Card/Marksheet/Income Certificate/Caste Certificate/Unknown)",
-  "extracted_data": {{
+  "extracted_data": {
     "name": "full name if found, else null",
     "document_number": "ID/number if found, else null",
     "dob": "date of birth if found, else null",
@@ -253,15 +666,15 @@ Return JSON with this exact structure:
     "caste_category": "caste category if caste certificate, else null",
     "issue_date": "certificate issue date if found, else null",
     "validity": "validity period if found, else null"
-  }},
+  },
   "confidence": 0-100,
   "is_valid_format": true/false,
   "quality_issues": ["list of any problems"],
   "text_clarity": "excellent/good/fair/poor",
   "completeness": 0-100
-}}
+}"""
 
-Scoring Guidelines:
+VALIDATION_GUIDELINES = """Scoring Guidelines:
 - confidence 80-100: Clear, readable, all key fields extracted
 - confidence 60-79: Readable, most fields present, minor OCR issues
 - confidence 40-59: Partially readable, some fields missing
@@ -269,30 +682,266 @@ Scoring Guidelines:
 
 Be realistic - real scanned documents may have minor imperfections but are still valid."""
 
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a document validator. Extract data accurately and give realistic confidence scores. Real scanned documents with minor imperfections should score 70-85."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            max_tokens=1500
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Clean markdown formatting
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-            result_text = result_text.strip()
+# Keys the verdict logic reads - a packed entry without them is retried on its own
+VALIDATION_REQUIRED_KEYS = {"document_type", "extracted_data", "confidence"}
+
+def parse_llm_json(result_text: str):
+    """Parse the model's JSON answer, tolerating a markdown code fence"""
+    result_text = result_text.strip()
+    if result_text.startswith("```"):
+        result_text = result_text.split("```")[1]
+        if result_text.startswith("json"):
+            result_text = result_text[4:]
+        result_text = result_text.strip()
+    return json.loads(result_text)
+
+def prepare_validation(text: str) -> tuple:
+    """(local result or None, compacted text, compaction stats) for one document"""
+    # Fast path - clear Aadhaar/PAN cards are settled locally without a Groq call
+    local_result = document_classifier.classify(text)
+    if local_result["confidence"] >= RULES_MIN_CONFIDENCE:
+        return local_result, None, None
+    
+    # Only the informative part of the OCR text goes into the prompt
+    compacted, compaction = document_classifier.compact(text, LLM_TEXT_TOKEN_BUDGET)
+    return None, compacted, compaction
+
+def llm_memo_key(compacted: str) -> str:
+    digest = hashlib.sha256(normalize_text(compacted).encode()).hexdigest()
+    return f"llm:{LLM_PROMPT_VERSION}:{digest}"
+
+def llm_memo_get(compacted: str, compaction: Dict):
+    result = llm_memo.get(llm_memo_key(compacted))
+    if result is not None:
+        result["text_compaction"] = compaction
+        result["memo_hit"] = True
+    return result
+
+def llm_memo_set(compacted: str, result: Dict):
+    llm_memo.set(llm_memo_key(compacted), result)
+
+async def llm_validate(compacted: str, compaction: Dict, check_memo: bool = True) -> Dict:
+    """Groq validation of one compacted document (check_memo=False when the caller already looked)"""
+    memoised = llm_memo_get(compacted, compaction) if check_memo else None
+    if memoised is not None:
+        return memoised
+    
+    try:
+        prompt = f"""Analyze this document and extract information. Return ONLY valid JSON.
+
+Document Text:
+{compacted}
+
+Return JSON with this exact structure:
+{VALIDATION_SCHEMA}
+
+{VALIDATION_GUIDELINES}"""
+
+        with timed("llm"):
+            result_text = await llm_client.complete(
+                [
+                    {"role": "system", "content": VALIDATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=1500
+            )
         
-        return json.loads(result_text)
+        result = parse_llm_json(result_text)
+        result["source"] = "llm"
+        llm_memo_set(compacted, result)
+        result["text_compaction"] = compaction
+        return result
         
+    except LLMQueueTimeout:
+        raise HTTPException(status_code=503, detail="AI validation is rate limited, please retry shortly",
+                            headers={"Retry-After": "10"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI validation failed: {str(e)}")
 
+async def llm_validate_packed(compacted_texts: List[str]) -> List:
+    """Groq validation of several documents in one call; entries missing from
+    the answer or lacking required keys come back as None"""
+    count = len(compacted_texts)
+    documents = "\n\n".join(f"=== Document {i} ===\n{compacted}"
+                            for i, compacted in enumerate(compacted_texts, 1))
+    prompt = f"""Analyze each of the {count} documents below independently and extract information. Return ONLY a valid JSON array with exactly {count} objects, one per document, in the same order.
+
+Each object must contain "index" (the number in the document's === Document N === header) and this exact structure:
+{VALIDATION_SCHEMA}
+
+{VALIDATION_GUIDELINES}
+
+{documents}"""
+    
+    try:
+        with timed("llm_packed"):
+            result_text = await llm_client.complete(
+                [
+                    {"role": "system", "content": VALIDATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=min(8000, 700 * count)
+            )
+    except LLMQueueTimeout:
+        raise HTTPException(status_code=503, detail="AI validation is rate limited, please retry shortly",
+                            headers={"Retry-After": "10"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI validation failed: {str(e)}")
+    
+    try:
+        entries = parse_llm_json(result_text)
+    except ValueError:
+        entries = []
+    if not isinstance(entries, list):
+        entries = []
+    
+    results = [None] * count
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not VALIDATION_REQUIRED_KEYS <= entry.keys():
+            continue
+        try:
+            index = int(entry.pop("index", position + 1)) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and results[index] is None:
+            results[index] = entry
+    return results
+
+async def ai_validate_document(text: str) -> Dict:
+    """AI-powered document validation with balanced criteria"""
+    local_result, compacted, compaction = prepare_validation(text)
+    if local_result is not None:
+        return local_result
+    return await llm_validate(compacted, compaction)
+
+class LLMPacker:
+    """Packs the Groq validations of one /verify-batch request into shared calls.
+
+    A pack is sent once it reaches the token budget or document cap, once every
+    file still in flight is waiting on it, or after BATCH_LLM_LINGER seconds.
+    """
+
+    def __init__(self, files: int, slots: asyncio.Semaphore):
+        self.active = files
+        self.slots = slots
+        self.pending = []
+        self.pending_tokens = 0
+        self.timer = None
+        self.tasks = set()
+    
+    async def validate(self, text: str) -> Dict:
+        local_result, compacted, compaction = prepare_validation(text)
+        if local_result is not None:
+            return local_result
+        memoised = llm_memo_get(compacted, compaction)
+        if memoised is not None:
+            return memoised
+        if not BATCH_LLM_PACKING:
+            async with self.slots:
+                return await llm_validate(compacted, compaction, check_memo=False)
+        
+        tokens = estimate_tokens(compacted)
+        if self.pending and self.pending_tokens + tokens > BATCH_LLM_TOKEN_BUDGET:
+            self.flush()
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((compacted, compaction, future))
+        self.pending_tokens += tokens
+        
+        if len(self.pending) >= min(BATCH_LLM_MAX_DOCS, self.active):
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(BATCH_LLM_LINGER, self.flush)
+        return await future
+    
+    def finished(self):
+        """A file left the pipeline - the files still pending may be all that is left"""
+        self.active -= 1
+        if self.pending and len(self.pending) >= self.active:
+            self.flush()
+    
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        pack, self.pending, self.pending_tokens = self.pending, [], 0
+        task = asyncio.create_task(self.send(pack))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def send(self, pack: List[tuple]):
+        try:
+            async with self.slots:
+                if len(pack) == 1:
+                    results = [None]
+                else:
+                    results = await llm_validate_packed([compacted for compacted, _, _ in pack])
+                for result, (compacted, compaction, _) in zip(results, pack):
+                    if result is not None:
+                        result["source"] = "llm"
+                        llm_memo_set(compacted, result)
+                        result["text_compaction"] = compaction
+                        result["llm_pack_size"] = len(pack)
+                
+                # Entries the packed answer did not cover are validated on their own
+                # (validate() already missed the memo for each of them)
+                retry = [i for i, result in enumerate(results) if result is None]
+                fallback = await asyncio.gather(*(llm_validate(pack[i][0], pack[i][1], check_memo=False)
+                                                  for i in retry), return_exceptions=True)
+                for i, result in zip(retry, fallback):
+                    results[i] = result
+        except Exception as e:
+            results = [e] * len(pack)
+        
+        for (_, _, future), result in zip(pack, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        for task in self.tasks:
+            task.cancel()
+
+def warm_imports():
+    preload(cv2, Image, pdf2image)
+    ocr_backend.warm()
+
+async def warm_job_queue():
+    job_queue.start()
+
+def warm_duplicate_index():
+    if DUPLICATE_CHECK:
+        duplicate_index()
+
+# Run before /health/ready reports ready (WARMUP_MODE). OCR workers load their
+# own copies of the heavy modules in warm_ocr_worker.
+warmup = WarmUp([
+    ("imports", warm_imports),
+    ("ocr_workers", ocr_engine.warm),
+    ("llm_client", llm_client.warm),
+    ("job_queue", warm_job_queue),
+    ("duplicate_index", warm_duplicate_index)
+])
+
+@app.on_event("startup")
+async def start_warmup():
+    await warmup.start()
+
+@app.on_event("shutdown")
+async def shutdown_engine():
+    warmup.stop()
+    await job_queue.shutdown()
+    ocr_engine.shutdown(wait=False)
+    await llm_client.close()
+
 @app.get("/")
 def root():
     return {
@@ -302,170 +951,416 @@ def root():
         "features": ["OCR", "Smart Tampering Detection", "AI Validation", "Data Extraction"]
     }
 
+@app.get("/health/live")
+def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    """Warm-up finished and the service can take verification traffic"""
+    if not warmup.ready:
+        return JSONResponse(warmup.status(), status_code=503, headers={"Retry-After": "5"})
+    return warmup.status()
+
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "verify_cache": verify_cache.stats(),
+        "llm_memo": llm_memo.stats(),
+        "pipeline_version": PIPELINE_VERSION,
+        "settings_digest": SETTINGS_DIGEST,
+        "llm_prompt_version": LLM_PROMPT_VERSION
+    }
+
+_duplicate_index = None
+
+def duplicate_index() -> DuplicateIndex:
+    """Opened on first use so OCR worker processes never touch the database"""
+    global _duplicate_index
+    if _duplicate_index is None:
+        _duplicate_index = DuplicateIndex(DUPLICATE_INDEX_DB, max_distance=DUPLICATE_MAX_DISTANCE)
+    return _duplicate_index
+
+def duplicate_numbers(result: Dict) -> List[str]:
+    """Identifiers worth indexing: Aadhaar/PAN pattern matches and the extracted document number"""
+    numbers = []
+    doc_type = result["document_type"].lower()
+    if "aadhaar" in doc_type or "pan" in doc_type:
+        numbers.extend(result["validation"]["numbers_found"])
+    extracted = (result.get("extracted_data") or {}).get("document_number")
+    # Years, dates and short codes would match across unrelated documents
+    if isinstance(extracted, str) and sum(ch.isdigit() for ch in extracted) >= 6:
+        numbers.append(extracted)
+    return numbers
+
+async def check_duplicates(upload: SpooledUpload, result: Dict, fingerprints: List[Dict],
+                           applicant_id: Optional[str]) -> Dict:
+    """Look the document up in the duplicate index, then add it"""
+    index = duplicate_index()
+    numbers = duplicate_numbers(result)
+    holder = (result.get("extracted_data") or {}).get("name")
+    with timed("duplicate_check"):
+        matches = await asyncio.to_thread(index.find, fingerprints, numbers, applicant_id, holder, upload.sha256)
+        await asyncio.to_thread(index.add, upload.sha256, fingerprints, numbers, applicant_id,
+                                upload.filename, result["document_type"], result["decision"], holder)
+    return {"prior_matches": matches, "pages_checked": len(fingerprints), "numbers_checked": len(numbers)}
+
+async def verify_document(upload: SpooledUpload, applicant_id: Optional[str] = None) -> Dict:
+    """Full single-document pipeline behind /verify and /jobs/verify"""
+    result, fingerprints = await run_verification(upload)
+    # Not cached with the verdict - matches depend on what was uploaded since
+    if DUPLICATE_CHECK and "validation" in result:
+        if fingerprints is None:
+            fingerprints = await asyncio.to_thread(duplicate_index().stored_fingerprints, upload.sha256) or []
+        result["duplicate_check"] = await check_duplicates(upload, result, fingerprints, applicant_id)
+    return result
+
+async def run_verification(upload: SpooledUpload) -> tuple:
+    """(verdict, page fingerprints) - fingerprints are None when the verdict came from the cache"""
+    cache_key = verify_cache_key("verify", upload)
+    cached = verify_cache.get(cache_key)
+    if cached is not None:
+        if "timestamp" in cached:
+            cached["timestamp"] = datetime.now().isoformat()
+        return cached, None
+    
+    # Extract text
+    text, tampering = await run_ocr(upload.path, upload.filename)
+    
+    if not text or len(text) < 20:
+        result = {
+            "status": "REJECTED",
+            "decision": "REJECT",
+            "reason": ["Cannot extract text - image quality too poor or document unreadable"],
+            "confidence_score": 0,
+            "authenticity_score": 0,
+            "document_type": "Unknown",
+            "extracted_data": {},
+            "raw_text": text[:500] if text else ""
+        }
+        verify_cache.set(cache_key, result)
+        return result, None
+    
+    # AI validation
+    ai_result = await ai_validate_document(text)
+    
+    # Pattern validation
+    pattern_check = validate_document_pattern(text, ai_result["document_type"])
+    
+    # Calculate scores
+    confidence = ai_result["confidence"]
+    authenticity = tampering["authenticity_score"]
+    
+    # IMPROVED Decision logic - More realistic thresholds
+    status = "VERIFIED"
+    decision = "ACCEPT"
+    reason = []
+    
+    # Critical failures - immediate rejection
+    if tampering["tampering_detected"] and authenticity < 60:  # Lowered from 70
+        status = "REJECTED"
+        decision = "REJECT"
+        reason.append("Document shows significant signs of tampering")
+    
+    if confidence < 45:  # Lowered from 60 - realistic scans may score 50-70
+        status = "REJECTED"
+        decision = "REJECT"
+        reason.append("Poor image quality - text not clearly readable")
+    
+    if ai_result["document_type"] == "Unknown":
+        status = "REJECTED"
+        decision = "REJECT"
+        reason.append("Cannot identify document type")
+    
+    # Relaxed validation - real documents may not match all patterns
+    if not pattern_check["pattern_found"] and not pattern_check["keywords_found"]:
+        # Only reject if BOTH are missing
+        status = "REJECTED"
+        decision = "REJECT"
+        reason.append("Document cannot be verified - missing key identifiers")
+    
+    # Combined score check - more lenient
+    if status != "REJECTED":
+        avg_score = (confidence + authenticity) / 2
+        if avg_score < 55:  # Lowered from 70
+            status = "REJECTED"
+            decision = "REJECT"
+            reason.append(f"Overall quality score too low ({round(avg_score, 1)}%)")
+        else:
+            reason.append("Document verified successfully")
+            if tampering.get("warnings"):
+                reason.append(f"Note: {', '.join(tampering['warnings'][:2])}")
+    
+    result = {
+        "status": status,
+        "decision": decision,
+        "reason": reason,
+        "document_type": ai_result["document_type"],
+        "extracted_data": ai_result["extracted_data"],  # Now included!
+        "confidence_score": round(confidence, 1),
+        "authenticity_score": round(authenticity, 1),
+        "text_clarity": ai_result.get("text_clarity", "unknown"),
+        "validation_source": ai_result.get("source", "llm"),
+        "text_compaction": ai_result.get("text_compaction"),
+        "completeness": ai_result.get("completeness", 0),
+        "tampering_issues": tampering["issues"],
+        "warnings": tampering.get("warnings", []),
+        "tampering_tier": tampering.get("tier", "full"),
+        "validation": {
+            "format_valid": ai_result["is_valid_format"],
+            "pattern_match": pattern_check["pattern_found"],
+            "keywords_found": pattern_check["keywords_found"],
+            "keyword_count": pattern_check["keyword_count"],
+            "numbers_found": pattern_check["document_numbers"]
+        },
+        "quality_metrics": tampering["metrics"],
+        "raw_text_preview": text[:300] + "..." if len(text) > 300 else text,
+        "timestamp": datetime.now().isoformat()
+    }
+    verify_cache.set(cache_key, result)
+    return result, tampering.get("fingerprints", [])
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition: stage latency histograms, queues, caches and Groq usage"""
+    caches = {"verify": verify_cache.stats(), "llm_memo": llm_memo.stats()}
+    limiter = llm_client.limiter
+    blocks = [
+        metrics.stage_seconds.render(),
+        metrics.format_metric("verify_queue_depth", "gauge", "Work waiting or running per queue", [
+            ({"queue": "ocr"}, ocr_engine.in_flight),
+            ({"queue": "jobs"}, job_queue.depth),
+            ({"queue": "llm_rate_limit"}, limiter.waiting if limiter else 0)
+        ]),
+        metrics.format_metric("verify_ocr_capacity", "gauge", "OCR jobs accepted before 503",
+                              [({}, ocr_engine.capacity)]),
+        metrics.format_metric("verify_cache_requests_total", "counter", "Cache lookups by result", [
+            ({"cache": name, "result": result}, stats[key])
+            for name, stats in caches.items() for result, key in (("hit", "hits"), ("miss", "misses"))
+        ]),
+        metrics.format_metric("verify_cache_hit_ratio", "gauge", "Cache hit rate since start", [
+            ({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()
+        ]),
+        metrics.format_metric("groq_tokens_total", "counter", "Tokens reported by the Groq API", [
+            ({"kind": "prompt"}, llm_client.stats["prompt_tokens"]),
+            ({"kind": "completion"}, llm_client.stats["completion_tokens"])
+        ]),
+        metrics.format_metric("groq_events_total", "counter", "Groq calls, retries, failures and 429s", [
+            ({"event": event}, llm_client.stats[event])
+            for event in ("requests", "retries", "errors", "rate_limited")
+        ])
+    ]
+    return PlainTextResponse("\n\n".join(blocks) + "\n", media_type="text/plain; version=0.0.4")
+
 @app.post("/verify")
-async def verify_single_document(file: UploadFile = File(...)):
+async def verify_single_document(file: UploadFile = File(...), applicant_id: Optional[str] = Form(None),
+                                 timings: bool = Query(False)):
     """Verify a single document with improved accuracy and extracted data"""
+    stage_timings = metrics.start_request_timings() if timings else None
+    started = datetime.now()
+    with timed("upload"):
+        upload = await spool_upload(file, UPLOAD_MAX_FILE_BYTES, UPLOAD_SPOOL_DIR)
     try:
-        file_bytes = await file.read()
+        result = await verify_document(upload, applicant_id)
+        if stage_timings is not None:
+            # Stage totals in ms; page stages overlap when pages run in parallel
+            result["timings"] = {
+                "total_ms": round((datetime.now() - started).total_seconds() * 1000, 1),
+                "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in stage_timings.items()},
+                "enabled": metrics.METRICS_ENABLED
+            }
+        return JSONResponse(result)
         
-        # Extract text
-        text, tampering = extract_text_from_file(file_bytes, file.filename)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        upload.cleanup()
+
+@app.post("/jobs/verify", status_code=202)
+async def submit_verify_job(file: UploadFile = File(...), applicant_id: Optional[str] = Form(None)):
+    """Queue a document for verification and return a job id straight away"""
+    upload = await spool_upload(file, UPLOAD_MAX_FILE_BYTES, UPLOAD_SPOOL_DIR)
+    
+    async def run_job():
+        try:
+            return await verify_document(upload, applicant_id)
+        finally:
+            upload.cleanup()
+    
+    try:
+        job = await job_queue.submit(run_job, filename=upload.filename)
+    except JobQueueFullError:
+        upload.cleanup()
+        raise HTTPException(status_code=503, detail="Job queue is full, please retry shortly",
+                            headers={"Retry-After": "10"})
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "queue_depth": job_queue.depth
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_verify_job(job_id: str, wait: float = Query(0, ge=0, le=JOB_MAX_WAIT)):
+    """Job status and result; wait > 0 long-polls until the job finishes"""
+    job = await job_queue.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+async def verify_batch_file(upload: SpooledUpload, ocr_slots: asyncio.Semaphore,
+                            packer: LLMPacker) -> Dict:
+    """Run one batch file through the OCR stage and then the LLM stage"""
+    filename = upload.filename
+    try:
+        cache_key = verify_cache_key("batch", upload)
+        cached = verify_cache.get(cache_key)
+        if cached is not None:
+            cached["filename"] = filename
+            return cached
+        
+        # Stage 1: OCR + tampering on the process pool
+        async with ocr_slots:
+            text, tampering = await run_ocr(upload.path, filename)
+        upload.cleanup()
         
         if not text or len(text) < 20:
-            return JSONResponse({
+            result = {
+                "filename": filename,
                 "status": "REJECTED",
                 "decision": "REJECT",
-                "reason": ["Cannot extract text - image quality too poor or document unreadable"],
-                "confidence_score": 0,
-                "authenticity_score": 0,
-                "document_type": "Unknown",
-                "extracted_data": {},
-                "raw_text": text[:500] if text else ""
-            })
-        
-        # AI validation
-        ai_result = ai_validate_document(text)
+                "reason": "Cannot extract text",
+                "confidence": 0,
+                "authenticity": 0,
+                "extracted_data": {}
+            }
+            verify_cache.set(cache_key, result)
+            return result
         
-        # Pattern validation
+        # Stage 2: Groq validation - the OCR slot is already free for the next file,
+        # and the packer may share one Groq call between several files
+        ai_result = await packer.validate(text)
         pattern_check = validate_document_pattern(text, ai_result["document_type"])
         
-        # Calculate scores
         confidence = ai_result["confidence"]
         authenticity = tampering["authenticity_score"]
         
-        # IMPROVED Decision logic - More realistic thresholds
         status = "VERIFIED"
         decision = "ACCEPT"
-        reason = []
         
-        # Critical failures - immediate rejection
-        if tampering["tampering_detected"] and authenticity < 60:  # Lowered from 70
+        # Apply improved criteria
+        if (tampering["tampering_detected"] and authenticity < 60) or \
+           confidence < 45 or \
+           ai_result["document_type"] == "Unknown":
             status = "REJECTED"
             decision = "REJECT"
-            reason.append("Document shows significant signs of tampering")
-        
-        if confidence < 45:  # Lowered from 60 - realistic scans may score 50-70
+        elif not pattern_check["pattern_found"] and not pattern_check["keywords_found"]:
             status = "REJECTED"
             decision = "REJECT"
-            reason.append("Poor image quality - text not clearly readable")
-        
-        if ai_result["document_type"] == "Unknown":
-            status = "REJECTED"
-            decision = "REJECT"
-            reason.append("Cannot identify document type")
-        
-        # Relaxed validation - real documents may not match all patterns
-        if not pattern_check["pattern_found"] and not pattern_check["keywords_found"]:
-            # Only reject if BOTH are missing
+        elif (confidence + authenticity) / 2 < 55:
             status = "REJECTED"
             decision = "REJECT"
-            reason.append("Document cannot be verified - missing key identifiers")
         
-        # Combined score check - more lenient
-        if status != "REJECTED":
-            avg_score = (confidence + authenticity) / 2
-            if avg_score < 55:  # Lowered from 70
-                status = "REJECTED"
-                decision = "REJECT"
-                reason.append(f"Overall quality score too low ({round(avg_score, 1)}%)")
-            else:
-                reason.append("Document verified successfully")
-                if tampering.get("warnings"):
-                    reason.append(f"Note: {', '.join(tampering['warnings'][:2])}")
-        
-        return JSONResponse({
+        result = {
+            "filename": filename,
             "status": status,
             "decision": decision,
-            "reason": reason,
             "document_type": ai_result["document_type"],
+            "confidence": round(confidence, 1),
+            "authenticity": round(authenticity, 1),
             "extracted_data": ai_result["extracted_data"],  # Now included!
-            "confidence_score": round(confidence, 1),
-            "authenticity_score": round(authenticity, 1),
-            "text_clarity": ai_result.get("text_clarity", "unknown"),
-            "completeness": ai_result.get("completeness", 0),
-            "tampering_issues": tampering["issues"],
-            "warnings": tampering.get("warnings", []),
-            "validation": {
-                "format_valid": ai_result["is_valid_format"],
-                "pattern_match": pattern_check["pattern_found"],
-                "keywords_found": pattern_check["keywords_found"],
-                "keyword_count": pattern_check["keyword_count"],
-                "numbers_found": pattern_check["document_numbers"]
-            },
-            "quality_metrics": tampering["metrics"],
-            "raw_text_preview": text[:300] + "..." if len(text) > 300 else text,
-            "timestamp": datetime.now().isoformat()
-        })
+            "tampering_detected": tampering["tampering_detected"],
+            "tampering_tier": tampering.get("tier", "full"),
+            "warnings": tampering.get("warnings", [])
+        }
+        verify_cache.set(cache_key, result)
+        return result
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return {
+            "filename": filename,
+            "status": "ERROR",
+            "decision": "REJECT",
+            "error": str(e),
+            "extracted_data": {}
+        }
+    finally:
+        upload.cleanup()
+        packer.finished()
+
+async def stream_batch_results(uploads: List[SpooledUpload], ocr_slots: asyncio.Semaphore,
+                               packer: LLMPacker):
+    """Yield one NDJSON line per file as it finishes, then a summary line"""
+    total = len(uploads)
+    summary = {"accepted": 0, "rejected": 0, "error": 0}
+    
+    async def indexed(index, upload):
+        return index, await verify_batch_file(upload, ocr_slots, packer)
+    
+    # Finished tasks are dropped as their line goes out, so a long batch does
+    # not hold every result until the stream ends
+    pending = {asyncio.create_task(indexed(i, upload)) for i, upload in enumerate(uploads)}
+    
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            while done:
+                task = done.pop()
+                pending.discard(task)
+                index, result = task.result()
+                summary["accepted"] += result.get("decision") == "ACCEPT"
+                summary["rejected"] += result.get("decision") == "REJECT"
+                summary["error"] += result.get("status") == "ERROR"
+                yield json.dumps({"event": "result", "index": index, **result}) + "\n"
+        
+        yield json.dumps({
+            "event": "summary",
+            "total_documents": total,
+            "summary": summary,
+            "timestamp": datetime.now().isoformat()
+        }) + "\n"
+    finally:
+        # Client went away - stop any files still in flight
+        for task in pending:
+            task.cancel()
+        packer.close()
+        # Tasks cancelled before they started never reach their own cleanup
+        for upload in uploads:
+            upload.cleanup()
 
 @app.post("/verify-batch")
-async def verify_multiple_documents(files: List[UploadFile] = File(...)):
+async def verify_multiple_documents(files: List[UploadFile] = File(...),
+                                    stream: bool = Query(False)):
     """Verify multiple documents with improved accuracy"""
-    results = []
-    
-    for file in files:
-        try:
+    uploads = []
+    total_bytes = 0
+    try:
+        for file in files:
             await file.seek(0)
-            file_bytes = await file.read()
-            
-            text, tampering = extract_text_from_file(file_bytes, file.filename)
-            
-            if not text or len(text) < 20:
-                results.append({
-                    "filename": file.filename,
-                    "status": "REJECTED",
-                    "decision": "REJECT",
-                    "reason": "Cannot extract text",
-                    "confidence": 0,
-                    "authenticity": 0,
-                    "extracted_data": {}
-                })
-                continue
-            
-            ai_result = ai_validate_document(text)
-            pattern_check = validate_document_pattern(text, ai_result["document_type"])
-            
-            confidence = ai_result["confidence"]
-            authenticity = tampering["authenticity_score"]
-            
-            status = "VERIFIED"
-            decision = "ACCEPT"
-            
-            # Apply improved criteria
-            if (tampering["tampering_detected"] and authenticity < 60) or \
-               confidence < 45 or \
-               ai_result["document_type"] == "Unknown":
-                status = "REJECTED"
-                decision = "REJECT"
-            elif not pattern_check["pattern_found"] and not pattern_check["keywords_found"]:
-                status = "REJECTED"
-                decision = "REJECT"
-            elif (confidence + authenticity) / 2 < 55:
-                status = "REJECTED"
-                decision = "REJECT"
-            
-            results.append({
-                "filename": file.filename,
-                "status": status,
-                "decision": decision,
-                "document_type": ai_result["document_type"],
-                "confidence": round(confidence, 1),
-                "authenticity": round(authenticity, 1),
-                "extracted_data": ai_result["extracted_data"],  # Now included!
-                "tampering_detected": tampering["tampering_detected"],
-                "warnings": tampering.get("warnings", [])
-            })
-            
-        except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "status": "ERROR",
-                "decision": "REJECT",
-                "error": str(e),
-                "extracted_data": {}
-            })
+            upload = await spool_upload(file, UPLOAD_MAX_FILE_BYTES, UPLOAD_SPOOL_DIR)
+            uploads.append(upload)
+            total_bytes += upload.size
+            if total_bytes > UPLOAD_MAX_REQUEST_BYTES:
+                raise too_large(UPLOAD_MAX_REQUEST_BYTES, "Batch")
+    except BaseException:
+        for upload in uploads:
+            upload.cleanup()
+        raise
+    
+    # Per-stage limits: file N+1 can be in OCR while file N waits on Groq
+    ocr_slots = asyncio.Semaphore(BATCH_OCR_CONCURRENCY)
+    packer = LLMPacker(len(uploads), asyncio.Semaphore(BATCH_LLM_CONCURRENCY))
+    
+    if stream:
+        return StreamingResponse(stream_batch_results(uploads, ocr_slots, packer),
+                                 media_type="application/x-ndjson")
+    
+    # gather() keeps results in upload order
+    coros = [verify_batch_file(upload, ocr_slots, packer) for upload in uploads]
+    results = await asyncio.gather(*coros)
     
     summary = {
         "accepted": sum(1 for r in results if r.get("decision") == "ACCEPT"),
@@ -0,0 +1,116 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus-style histogram with one label"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value_label: str, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(value_label)
+            if series is None:
+                series = self._series[value_label] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for value_label, values in sorted(series.items()):
+            label = f'{self.label}="{value_label}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return "\n".join(lines)
+
+
+def format_metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict, float]]) -> str:
+    """Prometheus text block for a gauge/counter from (labels, value) samples"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines)
+
+
+stage_seconds = Histogram("verify_stage_seconds", "Time spent in each verification pipeline stage", "stage")
+
+# Per-request stage totals for the optional /verify timings block
+_request_timings: ContextVar[Optional[Dict]] = ContextVar("request_timings", default=None)
+
+# Set while an OCR worker process runs a job; page threads append to it and
+# the job ships it back to the parent, whose histograms are the ones scraped
+_worker_times = None
+
+
+def record(stage: str, seconds: float):
+    if _worker_times is not None:
+        _worker_times.append((stage, seconds))
+        return
+    stage_seconds.observe(stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+_NO_TIMER = nullcontext()
+
+
+def timed(stage: str):
+    """Context manager timing one pipeline stage; a shared no-op when metrics are off"""
+    return _StageTimer(stage) if METRICS_ENABLED else _NO_TIMER
+
+
+def start_worker_collection():
+    global _worker_times
+    _worker_times = [] if METRICS_ENABLED else None
+
+
+def drain_worker_times() -> list:
+    global _worker_times
+    times, _worker_times = _worker_times, None
+    return times or []
+
+
+def start_request_timings() -> Dict:
+    """Collect stage totals for the current request (and tasks it spawns)"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
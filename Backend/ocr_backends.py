@@ -0,0 +1,128 @@
+import os
+import shutil
+import threading
+from typing import Optional
+
+import numpy as np
+
+from startup import lazy_import, preload, when_loaded
+
+pytesseract = lazy_import("pytesseract")
+tesserocr = lazy_import("tesserocr", optional=True)
+
+WINDOWS_TESSERACT = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+
+def configure_tesseract() -> Optional[str]:
+    """Locate the tesseract binary from TESSERACT_CMD, PATH or the default Windows install"""
+    cmd = os.getenv("TESSERACT_CMD") or shutil.which("tesseract")
+    if not cmd and os.path.exists(WINDOWS_TESSERACT):
+        cmd = WINDOWS_TESSERACT
+    if cmd:
+        # Applied when pytesseract is first imported, if it has not been yet
+        when_loaded(pytesseract, lambda module: setattr(module.pytesseract, "tesseract_cmd", cmd))
+        tessdata = os.path.join(os.path.dirname(cmd), "tessdata")
+        if "TESSDATA_PREFIX" not in os.environ and os.path.isdir(tessdata):
+            os.environ["TESSDATA_PREFIX"] = tessdata
+    return cmd
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI per call (temp image file + subprocess); timeout (s) kills a hung call"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng", timeout: float = 0):
+        self.lang = lang
+        self.timeout = timeout
+
+    def warm(self):
+        preload(pytesseract)
+
+    def image_to_string(self, image: np.ndarray, psm: int = 6) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang, config=f'--psm {psm}', timeout=self.timeout)
+
+    def recognize(self, image: np.ndarray, psm: int = 6) -> tuple:
+        """Return (text, mean word confidence)"""
+        data = pytesseract.image_to_data(image, lang=self.lang, config=f'--psm {psm}',
+                                         output_type=pytesseract.Output.DICT, timeout=self.timeout)
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if confidence < 0 or not word.strip():
+                continue
+            line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(line, []).append(word)
+            confidences.append(confidence)
+
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, float(np.mean(confidences)) if confidences else 0.0
+
+
+class TesserocrBackend:
+    """Long-lived in-process Tesseract API handles, one per thread, fed raw pixel buffers"""
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", fallback: PytesseractBackend = None):
+        self.lang = lang
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            # Loading traineddata is the expensive part - done once per thread
+            path = os.getenv("TESSDATA_PREFIX")
+            kwargs = {"lang": self.lang}
+            if path:
+                kwargs["path"] = path
+            api = self._local.api = tesserocr.PyTessBaseAPI(**kwargs)
+        return api
+
+    def warm(self):
+        preload(pytesseract)
+        self._api()
+
+    def _set_image(self, api, image: np.ndarray, psm: int):
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        api.SetPageSegMode(psm)
+        api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+
+    def image_to_string(self, image: np.ndarray, psm: int = 6) -> str:
+        try:
+            api = self._api()
+            self._set_image(api, image, psm)
+            return api.GetUTF8Text()
+        except Exception:
+            if self.fallback is None:
+                raise
+            return self.fallback.image_to_string(image, psm)
+
+    def recognize(self, image: np.ndarray, psm: int = 6) -> tuple:
+        try:
+            api = self._api()
+            self._set_image(api, image, psm)
+            text = api.GetUTF8Text()
+            confidences = api.AllWordConfidences()
+        except Exception:
+            if self.fallback is None:
+                raise
+            return self.fallback.recognize(image, psm)
+
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        return "\n".join(lines), float(np.mean(confidences)) if confidences else 0.0
+
+
+def create_backend(kind: str = "auto", lang: str = "eng", timeout: float = 0):
+    """OCR backend by name: 'tesserocr', 'pytesseract' or 'auto' (tesserocr when installed).
+    timeout bounds each tesseract CLI call; in-process tesserocr calls rely on the job timeout."""
+    fallback = PytesseractBackend(lang, timeout)
+    if kind == "pytesseract" or (kind == "auto" and tesserocr is None):
+        return fallback
+    if tesserocr is None:
+        raise RuntimeError("OCR_BACKEND=tesserocr but the tesserocr package is not installed")
+    return TesserocrBackend(lang, fallback=fallback)
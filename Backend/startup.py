@@ -0,0 +1,123 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+import types
+from typing import Awaitable, Callable, Dict, List, Tuple, Union
+
+# Heavy third-party modules (OpenCV, Tesseract, PIL, pdf2image, speech) are
+# imported on first use instead of at startup, so freshly scaled-up workers
+# come up quickly; the warm-up hook loads them before the service reports ready
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "true").lower() == "true"
+
+# "background" warms up after the server starts (/health/ready is 503 until
+# done), "blocking" finishes warm-up before the server accepts connections,
+# "off" reports ready straight away and leaves everything to first use
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports the real one on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_hooks"] = []
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self):
+        with self.__dict__["_lazy_lock"]:
+            module = self.__dict__["_lazy_module"]
+            if module is None:
+                module = importlib.import_module(self.__name__)
+                # Later lookups hit the copied attributes and skip __getattr__
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+                for hook in self.__dict__["_lazy_hooks"]:
+                    hook(module)
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name: str, optional: bool = False):
+    """The module itself (LAZY_IMPORTS off or already imported) or a LazyModule for it.
+    With optional=True a module that is not installed comes back as None."""
+    if optional and importlib.util.find_spec(name.split(".")[0]) is None:
+        return None
+    if not LAZY_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    return LazyModule(name)
+
+
+def is_loaded(module) -> bool:
+    return not isinstance(module, LazyModule) or module.__dict__["_lazy_module"] is not None
+
+
+def when_loaded(module, hook: Callable):
+    """Run hook(module) once the module is really imported (now, if it already is)"""
+    if is_loaded(module):
+        hook(module)
+    else:
+        module.__dict__["_lazy_hooks"].append(hook)
+
+
+def preload(*modules):
+    """Import deferred modules now"""
+    for module in modules:
+        if module is not None and not is_loaded(module):
+            module._load()
+
+
+class WarmUp:
+    """Runs the warm-up steps once and tracks readiness separately from liveness"""
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Union[None, Awaitable]]]]):
+        self.steps = steps
+        self.started_at = time.time()
+        self.state = "pending"  # pending, warming, ready, failed, stopping
+        self.results = {}  # step -> {"ms": ..., "error": ...}
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    async def run(self):
+        self.state = "warming"
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                # Blocking steps run in a thread so liveness probes are still answered
+                if asyncio.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+                self.results[name] = {"ms": round((time.perf_counter() - start) * 1000, 1)}
+            except Exception as e:
+                self.results[name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+        if self.state == "warming":
+            self.state = "failed" if any("error" in r for r in self.results.values()) else "ready"
+
+    async def start(self, mode: str = WARMUP_MODE):
+        """Startup hook: warm up according to WARMUP_MODE"""
+        if mode == "off":
+            self.state = "ready"
+        elif mode == "blocking":
+            await self.run()
+        else:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        """Shutdown hook: stop reporting ready so load balancers drain this instance"""
+        self.state = "stopping"
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def status(self) -> Dict:
+        return {"status": self.state, "uptime_s": round(time.time() - self.started_at, 1),
+                "lazy_imports": LAZY_IMPORTS, "warmup": self.results}
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+from bench.import_budget import DEFERRED, check
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+@pytest.mark.parametrize("module", sorted(DEFERRED))
+def test_import_stays_lazy_and_within_budget(module):
+    # Each run is a cold import in a fresh interpreter
+    report = check([module], BUDGET_MS, runs=3, lazy=True)
+    assert report["modules"][module]["loaded_heavy"] == []
+    assert report["modules"][module]["median_ms"] <= BUDGET_MS
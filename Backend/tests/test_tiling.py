@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from bench.generate import generate_document
+from bench.tiling_check import check_page
+
+
+@pytest.fixture(scope="module")
+def report():
+    # Scan-like, so every metric has something to measure; a 64 px tile cuts the page into many tiles
+    page, _ = generate_document("income", "small", np.random.default_rng(0), noise=6.0, skew=0.8, jpeg_quality=75)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        return check_page(page, tile=64, pool=pool)
+
+
+def test_tiled_metrics_match_whole_page(report):
+    for name, values in report["metrics"].items():
+        assert values["relative_error"] <= 0.01, name
+
+
+def test_tiled_preprocessing_matches_whole_page(report):
+    for variant, agreement in report["pixels"].items():
+        assert agreement >= 0.999, variant
+
+
+def test_tiled_tampering_score_matches_whole_page(report):
+    scores = report["tampering_score"]
+    assert abs(scores["full"] - scores["tiled"]) <= 1.0
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """An upload copied to a private file on disk, with its size and SHA-256"""
+
+    def __init__(self, filename: str, path: str, size: int, sha256: str):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def cleanup(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def too_large(limit: int, what: str = "Upload") -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what} exceeds the {limit // (1024 * 1024)} MB limit")
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int, spool_dir: Optional[str] = None) -> SpooledUpload:
+    """Stream an upload to disk chunk by chunk, hashing as it goes and stopping at max_bytes"""
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large(max_bytes, f"File {upload.filename}")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    finally:
+        # Frees the parser's own spooled copy straight away
+        await upload.close()
+    return SpooledUpload(upload.filename, path, size, digest.hexdigest())
+
+
+class BodySizeLimitMiddleware:
+    """Rejects request bodies over max_bytes with 413 while they stream in, before
+    the multipart parser has buffered them"""
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            body = json.dumps({"detail": too_large(self.max_bytes, "Request body").detail}).encode()
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Chunked bodies have no Content-Length - the route's exception
+                    # handling turns this into the 413 response
+                    raise too_large(self.max_bytes, "Request body")
+            return message
+
+        await self.app(scope, limited_receive, send)
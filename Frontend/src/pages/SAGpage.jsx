@@ -730,6 +730,8 @@ const SAGVerifyPage = () => {
       if (selectedApplication) {
         formData.append('student_name', selectedApplication.name);
         formData.append('application_id', selectedApplication.id.toString());
+        // Lets the duplicate check skip this student's own earlier uploads
+        formData.append('applicant_id', selectedApplication.student);
       }
 
       const progressInterval = setInterval(() => {